@@ -0,0 +1,30 @@
+from django.contrib import admin
+
+from .models import QueryStat
+
+
+@admin.register(QueryStat)
+class QueryStatAdmin(admin.ModelAdmin):
+    list_display = ('short_fingerprint', 'view', 'source', 'template',
+                    'calls', 'requests', 'total_ms', 'avg_ms',
+                    'max_repeats', 'repeated_requests', 'last_seen')
+    list_filter = ('view',)
+    search_fields = ('fingerprint', 'source', 'template')
+    ordering = ('-total_time',)
+    readonly_fields = [field.name for field in QueryStat._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def short_fingerprint(self, stat):
+        return stat.fingerprint[:120]
+    short_fingerprint.short_description = 'запрос'
+
+    def total_ms(self, stat):
+        return round(stat.total_time * 1000, 1)
+    total_ms.short_description = 'всего, мс'
+    total_ms.admin_order_field = 'total_time'
+
+    def avg_ms(self, stat):
+        return round(stat.total_time * 1000 / max(stat.calls, 1), 2)
+    avg_ms.short_description = 'в среднем, мс'
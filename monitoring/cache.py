@@ -0,0 +1,33 @@
+"""Cache backends that report the time spent in cache calls."""
+from django.core.cache.backends.locmem import LocMemCache
+
+from monitoring.timing import measure
+from yatube.sqlite_cache import SQLiteCache
+
+TIMED_METHODS = ('add', 'get', 'set', 'touch', 'delete', 'get_many',
+                 'has_key', 'incr', 'set_many', 'delete_many', 'clear')
+
+
+def _timed(name):
+    def method(self, *args, **kwargs):
+        with measure('cache'):
+            return getattr(super(TimedCacheMixin, self), name)(
+                *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+class TimedCacheMixin:
+    pass
+
+
+for _name in TIMED_METHODS:
+    setattr(TimedCacheMixin, _name, _timed(_name))
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    pass
+
+
+class TimedSQLiteCache(TimedCacheMixin, SQLiteCache):
+    pass
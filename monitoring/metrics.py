@@ -0,0 +1,321 @@
+"""Counters and histograms shared by all worker processes on one host.
+
+Every process writes its own values into METRICS_DIR/<pid>.metrics, a
+memory-mapped file of (key, double) records, so recording a value only
+takes an uncontended in-process lock. `/metrics` sums the files of all
+processes and renders them in the Prometheus text format. When a new
+process starts writing, the files of processes that are gone are added
+into METRICS_DIR/merged.metrics and removed, so totals never go down when
+workers are replaced. Only counters and histograms exist; both can be
+summed this way.
+"""
+import contextlib
+import fcntl
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+HEADER = struct.Struct('Q')
+KEY_LENGTH = struct.Struct('I')
+VALUE = struct.Struct('d')
+INITIAL_SIZE = 64 * 1024
+MERGED = 'merged.metrics'
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (10e3, 100e3, 1e6, 5e6, 10e6, 50e6)
+
+REGISTRY = []
+
+
+def _padded(length):
+    return (length + 7) // 8 * 8
+
+
+def _records(data):
+    """Yield (key, value, value offset) from the bytes of a metrics file."""
+    used = HEADER.unpack_from(data, 0)[0]
+    position = HEADER.size
+    while position < used:
+        length = KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + KEY_LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        offset = _padded(start + length)
+        yield key, VALUE.unpack_from(data, offset)[0], offset
+        position = offset + VALUE.size
+
+
+def _pack(values):
+    """The bytes of a metrics file holding `values`."""
+    data = bytearray(HEADER.size)
+    for key, value in values.items():
+        encoded = key.encode()
+        data += KEY_LENGTH.pack(len(encoded)) + encoded
+        data += bytes(_padded(len(data)) - len(data))
+        data += VALUE.pack(value)
+    HEADER.pack_into(data, 0, len(data))
+    return bytes(data)
+
+
+def _read(path, totals):
+    """Add the values of one metrics file to `totals`."""
+    try:
+        with open(path, 'rb') as handle:
+            data = handle.read()
+    except FileNotFoundError:
+        return
+    if len(data) >= HEADER.size:
+        for key, value, _ in _records(data):
+            totals[key] = totals.get(key, 0.0) + value
+
+
+@contextlib.contextmanager
+def _locked(directory, operation):
+    """Readers take the lock shared and the merge exclusively, so nobody
+    sees a dead process's values both merged and in its own file."""
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(os.path.join(directory, 'merge.lock'),
+                 os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, operation)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class FileStore:
+    """The values of this process, in a file only this process writes."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self._merge_dead(directory)
+        self.path = os.path.join(directory, f'{self.pid}.metrics')
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size < INITIAL_SIZE:
+            os.ftruncate(self.fd, INITIAL_SIZE)
+        self.map = mmap.mmap(self.fd, 0)
+        if HEADER.unpack_from(self.map, 0)[0] == 0:
+            HEADER.pack_into(self.map, 0, HEADER.size)
+        self.offsets = {key: offset
+                        for key, _, offset in _records(self.map)}
+
+    @staticmethod
+    def _merge_dead(directory):
+        with _locked(directory, fcntl.LOCK_EX):
+            dead = []
+            for path in glob.glob(os.path.join(directory, '*.metrics')):
+                name = os.path.basename(path).split('.')[0]
+                if name.isdigit() and not _alive(int(name)):
+                    dead.append(path)
+            if not dead:
+                return
+            merged = os.path.join(directory, MERGED)
+            totals = {}
+            for path in (merged, *dead):
+                _read(path, totals)
+            temporary = f'{merged}.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as handle:
+                handle.write(_pack(totals))
+            os.replace(temporary, merged)
+            for path in dead:
+                os.remove(path)
+
+    def _append(self, key):
+        encoded = key.encode()
+        used = HEADER.unpack_from(self.map, 0)[0]
+        offset = _padded(used + KEY_LENGTH.size + len(encoded))
+        end = offset + VALUE.size
+        if end > len(self.map):
+            size = len(self.map)
+            while size < end:
+                size *= 2
+            self.map.close()
+            os.ftruncate(self.fd, size)
+            self.map = mmap.mmap(self.fd, 0)
+        KEY_LENGTH.pack_into(self.map, used, len(encoded))
+        self.map[used + KEY_LENGTH.size:used + KEY_LENGTH.size
+                 + len(encoded)] = encoded
+        VALUE.pack_into(self.map, offset, 0.0)
+        # Readers only look as far as the header says, so the record is
+        # published after it is complete.
+        HEADER.pack_into(self.map, 0, end)
+        self.offsets[key] = offset
+        return offset
+
+    def add(self, increments):
+        with self.lock:
+            for key, amount in increments:
+                offset = self.offsets.get(key)
+                if offset is None:
+                    offset = self._append(key)
+                value = VALUE.unpack_from(self.map, offset)[0]
+                VALUE.pack_into(self.map, offset, value + amount)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store
+    directory = settings.METRICS_DIR
+    current = _store
+    if (current is None or current.pid != os.getpid()
+            or current.directory != directory):
+        with _store_lock:
+            current = _store
+            if (current is None or current.pid != os.getpid()
+                    or current.directory != directory):
+                _store = current = FileStore(directory)
+    return current
+
+
+def _key(sample, labels):
+    return json.dumps([sample, sorted(labels.items())], ensure_ascii=False)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        return {name: str(value) for name, value in labels.items()}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        labels = self._labels(labels)
+        store().add([(_key(f'{self.name}_total', labels), amount)])
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        bound = next((b for b in self.buckets if value <= b), float('inf'))
+        # Buckets are stored per interval and made cumulative when read.
+        store().add([
+            (_key(f'{self.name}_bucket', {**labels, 'le': _number(bound)}),
+             1),
+            (_key(f'{self.name}_sum', labels), value),
+            (_key(f'{self.name}_count', labels), 1),
+        ])
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def collect():
+    """Sum the values written by every process."""
+    totals = {}
+    with _locked(settings.METRICS_DIR, fcntl.LOCK_SH):
+        for path in glob.glob(os.path.join(settings.METRICS_DIR,
+                                           '*.metrics')):
+            _read(path, totals)
+    return totals
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace('\n', '\\n')
+            .replace('"', '\\"'))
+
+
+def _format(sample, labels, value):
+    if labels:
+        rendered = ','.join(f'{name}="{_escape(label)}"'
+                            for name, label in labels)
+        sample = f'{sample}{{{rendered}}}'
+    return f'{sample} {_number(value) if value % 1 else int(value)}'
+
+
+def exposition():
+    samples = {}
+    for key, value in collect().items():
+        sample, labels = json.loads(key)
+        samples.setdefault(sample, []).append(
+            (tuple(tuple(pair) for pair in labels), value))
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        if metric.kind == 'counter':
+            for labels, value in sorted(samples.get(f'{metric.name}_total',
+                                                    [])):
+                lines.append(_format(f'{metric.name}_total', labels, value))
+            continue
+        lines.extend(_histogram_lines(metric, samples))
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(metric, samples):
+    buckets = {}
+    for labels, value in samples.get(f'{metric.name}_bucket', []):
+        series = tuple(pair for pair in labels if pair[0] != 'le')
+        le = dict(labels)['le']
+        buckets.setdefault(series, {})[le] = value
+    sums = dict(samples.get(f'{metric.name}_sum', []))
+    counts = dict(samples.get(f'{metric.name}_count', []))
+    lines = []
+    for series in sorted(counts):
+        observed = buckets.get(series, {})
+        cumulative = 0
+        for bound in (*metric.buckets, float('inf')):
+            cumulative += observed.get(_number(bound), 0)
+            lines.append(_format(f'{metric.name}_bucket',
+                                 (*series, ('le', _number(bound))),
+                                 cumulative))
+        lines.append(_format(f'{metric.name}_sum', series, sums[series]))
+        lines.append(_format(f'{metric.name}_count', series, counts[series]))
+    return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа по имени URL',
+    ['view'])
+REQUEST_QUERIES = Histogram(
+    'yatube_request_queries', 'SQL-запросов на один ответ',
+    ['view'], buckets=QUERY_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'yatube_cache_requests', 'Обращения к кэшу страниц и карточек',
+    ['cache', 'result'])
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_seconds', 'Время генерации миниатюр одного поста')
+UPLOAD_BYTES = Histogram(
+    'yatube_upload_bytes', 'Размер загруженных картинок',
+    buckets=SIZE_BUCKETS)
@@ -0,0 +1,98 @@
+import contextlib
+import os
+import random
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+
+from monitoring import metrics, profiler, timing
+from monitoring.querylog import QueryLog
+
+HEADER_ORDER = ('db', 'template', 'cache', 'thumbnail')
+
+
+def _timed_execute(execute, sql, params, many, context):
+    with timing.measure('db'):
+        return execute(sql, params, many, context)
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.view_name:
+        return 'unresolved'
+    return re.sub(r'[^\w.-]', '.', match.view_name)
+
+
+class ServerTimingMiddleware:
+    """Report where the request time went in a Server-Timing header.
+
+    Put it first in MIDDLEWARE so `total` covers the other middleware.
+    Latency and query counts also go to the /metrics histograms, and a
+    PROFILE_SAMPLE_RATE fraction of requests is profiled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = timing.start()
+        sampled = random.random() < settings.PROFILE_SAMPLE_RATE
+        if sampled:
+            profiler.begin()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_timed_execute))
+                response = self.get_response(request)
+        finally:
+            timing.stop()
+            if sampled:
+                profiler.end(url_name(request))
+        view = url_name(request)
+        metrics.REQUEST_SECONDS.observe(timer.total, view=view)
+        metrics.REQUEST_QUERIES.observe(timer.counts.get('db', 0), view=view)
+        if self.visible(request):
+            response['Server-Timing'] = self.header(timer)
+        return response
+
+    def visible(self, request):
+        if settings.SERVER_TIMING_PUBLIC:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def header(self, timer):
+        metrics = []
+        for category in HEADER_ORDER:
+            if category in timer.durations:
+                metrics.append(
+                    f'{category};dur={timer.durations[category] * 1000:.1f}'
+                    f';desc="{timer.counts[category]}"')
+        metrics.append(f'total;dur={timer.total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+class QueryLogMiddleware:
+    """Log every request's queries by fingerprint (QUERY_LOG_ENABLED)."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        os.makedirs(os.path.dirname(settings.QUERY_LOG_FILE), exist_ok=True)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+        if log.entries:
+            # The wrapper is gone, so these writes are not logged; one
+            # transaction keeps them to a single commit.
+            with transaction.atomic():
+                log.report(url_name(request), request.path)
+        return response
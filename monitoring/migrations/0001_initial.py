@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('fingerprint', models.TextField(verbose_name='запрос')),
+                ('view', models.CharField(max_length=200, verbose_name='view')),
+                ('source', models.CharField(blank=True, max_length=300, verbose_name='строка кода')),
+                ('template', models.CharField(blank=True, max_length=300, verbose_name='строка шаблона')),
+                ('calls', models.PositiveIntegerField(default=0, verbose_name='выполнений')),
+                ('requests', models.PositiveIntegerField(default=0, verbose_name='запросов к сайту')),
+                ('total_time', models.FloatField(default=0, verbose_name='всего, с')),
+                ('max_repeats', models.PositiveIntegerField(default=0, verbose_name='макс. повторов')),
+                ('repeated_requests', models.PositiveIntegerField(default=0, verbose_name='из них N+1')),
+                ('last_seen', models.DateTimeField(verbose_name='последний раз')),
+            ],
+            options={
+                'verbose_name': 'статистика SQL-запроса',
+                'verbose_name_plural': 'статистика SQL-запросов',
+                'ordering': ['-total_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0002_heartbeat'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Heartbeat',
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class QueryStat(models.Model):
+    """Totals for one SQL fingerprint issued from one place in one view."""
+    key = models.CharField(max_length=40, unique=True)
+    fingerprint = models.TextField('запрос')
+    view = models.CharField('view', max_length=200)
+    source = models.CharField('строка кода', max_length=300, blank=True)
+    template = models.CharField('строка шаблона', max_length=300,
+                                blank=True)
+    calls = models.PositiveIntegerField('выполнений', default=0)
+    requests = models.PositiveIntegerField('запросов к сайту', default=0)
+    total_time = models.FloatField('всего, с', default=0)
+    max_repeats = models.PositiveIntegerField('макс. повторов', default=0)
+    repeated_requests = models.PositiveIntegerField('из них N+1', default=0)
+    last_seen = models.DateTimeField('последний раз')
+
+    class Meta:
+        ordering = ['-total_time']
+        verbose_name = 'статистика SQL-запроса'
+        verbose_name_plural = 'статистика SQL-запросов'
+
+    def __str__(self):
+        return self.fingerprint[:80]
+
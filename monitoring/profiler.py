@@ -0,0 +1,92 @@
+"""Statistical sampling profiler for a fraction of requests.
+
+A daemon thread looks at the stacks of the threads that serve sampled
+requests every PROFILE_INTERVAL seconds. When a request finishes, its
+stacks are appended to PROFILE_DIR/<url name>.folded in the collapsed
+format ("frame;frame;frame count") read by flamegraph.pl and speedscope.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_sampler = None
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{module}:{code.co_name}'
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler(threading.Thread):
+
+    def __init__(self, interval):
+        super().__init__(name='profiler', daemon=True)
+        self.interval = interval
+        self.stacks = {}
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with _lock:
+                watched = list(self.stacks.items())
+            if not watched:
+                continue
+            frames = sys._current_frames()
+            for thread_id, counter in watched:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    counter[collapse(frame)] += 1
+
+
+def _running_sampler():
+    global _sampler
+    with _lock:
+        # The thread does not survive a fork into a new worker process.
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = Sampler(settings.PROFILE_INTERVAL)
+            _sampler.start()
+        return _sampler
+
+
+def begin():
+    sampler = _running_sampler()
+    with _lock:
+        sampler.stacks[threading.get_ident()] = collections.Counter()
+
+
+def end(name):
+    """Stop sampling the current thread and store what was collected."""
+    sampler = _sampler
+    if sampler is None:
+        return
+    with _lock:
+        stacks = sampler.stacks.pop(threading.get_ident(), None)
+    if stacks:
+        write(name, stacks)
+
+
+def write(name, stacks):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_DIR, f'{name}.folded')
+    lines = ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+    # One write on an O_APPEND descriptor, so concurrent workers do not
+    # interleave their lines.
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, lines.encode())
+    finally:
+        os.close(fd)
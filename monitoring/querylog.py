@@ -0,0 +1,129 @@
+"""Per-request SQL log grouped by query fingerprint.
+
+Every query is normalised to a fingerprint (literals and IN lists
+collapsed) and attributed to the application code line and the template
+line that issued it. A fingerprint repeated QUERY_LOG_REPEAT_THRESHOLD
+times within one request is reported as a likely N+1.
+"""
+import hashlib
+import json
+import logging
+import re
+import sys
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('monitoring.queries')
+
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+_IGNORED_PATHS = ('/django/', '/site-packages/', '/monitoring/')
+
+
+def fingerprint(sql):
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _origin(frame):
+    """Return (code line, template line) that led to the query."""
+    source = template = ''
+    while frame is not None and not (source and template):
+        code = frame.f_code
+        if not template and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                template = f'{name}:{token.lineno}'
+        filename = code.co_filename
+        if (not source and filename.startswith(settings.BASE_DIR)
+                and not any(part in filename for part in _IGNORED_PATHS)):
+            path = filename[len(settings.BASE_DIR):].lstrip('/')
+            source = f'{path}:{frame.f_lineno} {code.co_name}'
+        frame = frame.f_back
+    return source, template
+
+
+class QueryLog:
+    """execute_wrapper that collects the queries of one request."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            text = fingerprint(sql)
+            source, template = _origin(sys._getframe(1))
+            entry = self.entries.setdefault(
+                (text, source, template), {'calls': 0, 'time': 0.0})
+            entry['calls'] += 1
+            entry['time'] += duration
+
+    def repeated(self):
+        threshold = settings.QUERY_LOG_REPEAT_THRESHOLD
+        return {key: entry for key, entry in self.entries.items()
+                if entry['calls'] >= threshold}
+
+    def report(self, view, path):
+        repeated = self.repeated()
+        logger.info(json.dumps({
+            'view': view,
+            'path': path,
+            'queries': sum(e['calls'] for e in self.entries.values()),
+            'time_ms': round(sum(e['time'] for e in self.entries.values())
+                             * 1000, 3),
+            'fingerprints': [
+                {'sql': sql, 'source': source, 'template': template,
+                 'calls': entry['calls'],
+                 'time_ms': round(entry['time'] * 1000, 3),
+                 'n_plus_one': (sql, source, template) in repeated}
+                for (sql, source, template), entry in sorted(
+                    self.entries.items(), key=lambda item: -item[1]['time'])
+            ],
+        }, ensure_ascii=False))
+        if repeated:
+            logger.warning('N+1 in %s: %s', view, '; '.join(
+                f'{entry["calls"]}x {source or template}: {sql[:120]}'
+                for (sql, source, template), entry in repeated.items()))
+        self.store(view)
+
+    def store(self, view):
+        from monitoring.models import QueryStat
+
+        threshold = settings.QUERY_LOG_REPEAT_THRESHOLD
+        now = timezone.now()
+        stats = []
+        for (sql, source, template), entry in self.entries.items():
+            raw = '|'.join([view, source, template, sql])
+            key = hashlib.sha1(raw.encode()).hexdigest()
+            stats.append((QueryStat(key=key, fingerprint=sql, view=view,
+                                    source=source[:300],
+                                    template=template[:300],
+                                    last_seen=now), entry))
+        QueryStat.objects.bulk_create([stat for stat, _ in stats],
+                                      ignore_conflicts=True)
+        for stat, entry in stats:
+            QueryStat.objects.filter(key=stat.key).update(
+                calls=F('calls') + entry['calls'],
+                requests=F('requests') + 1,
+                total_time=F('total_time') + entry['time'],
+                max_repeats=Greatest(F('max_repeats'), entry['calls']),
+                repeated_requests=(F('repeated_requests')
+                                   + int(entry['calls'] >= threshold)),
+                last_seen=now)
@@ -0,0 +1,47 @@
+"""Template backend that reports rendering time to the request timer."""
+import os
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (DjangoTemplates as
+                                             BaseDjangoTemplates,
+                                             Template as BaseTemplate,
+                                             reraise)
+
+from monitoring.timing import measure
+
+
+class Template(BaseTemplate):
+
+    def render(self, context=None, request=None):
+        with measure('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+    def precompile(self, extension='.html'):
+        """Load every template the loaders can find, so a cached loader
+        holds them all parsed before the first request."""
+        loaded = 0
+        for loader in self.engine.template_loaders:
+            for inner in getattr(loader, 'loaders', [loader]):
+                for directory in inner.get_dirs():
+                    for root, _, files in os.walk(directory):
+                        for name in files:
+                            if not name.endswith(extension):
+                                continue
+                            path = os.path.join(root, name)
+                            self.engine.get_template(
+                                os.path.relpath(path, directory)
+                                .replace(os.sep, '/'))
+                            loaded += 1
+        return loaded
@@ -0,0 +1,233 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from monitoring import metrics, timing
+from monitoring.models import QueryStat
+from monitoring.querylog import QueryLog, fingerprint
+from posts.models import Post
+
+User = get_user_model()
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+class TimingTests(TestCase):
+
+    def test_nested_measurements_are_counted_once(self):
+        timer = timing.start()
+        try:
+            with timing.measure('template'):
+                with timing.measure('template'):
+                    pass
+            with timing.measure('cache'):
+                pass
+        finally:
+            timing.stop()
+        self.assertEqual(timer.counts, {'template': 1, 'cache': 1})
+
+    def test_measure_without_request_is_noop(self):
+        with timing.measure('db'):
+            pass
+        self.assertIsNone(timing.current())
+
+
+class ServerTimingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='timed')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def metrics(self, response):
+        return {item.split(';')[0]
+                for item in response['Server-Timing'].split(', ')}
+
+    @override_settings(SERVER_TIMING_PUBLIC=True)
+    def test_header_breakdown(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(self.metrics(response),
+                         {'db', 'template', 'cache', 'total'})
+        # A page cache hit renders nothing and queries nothing.
+        response = self.client.get(reverse('index'))
+        self.assertEqual(self.metrics(response), {'cache', 'total'})
+
+    @override_settings(SERVER_TIMING_PUBLIC=False)
+    def test_header_only_for_staff(self):
+        response = self.client.get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('index'))
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_INTERVAL=0.0005,
+                       PROFILE_DIR=PROFILE_DIR)
+    def test_sampled_request_writes_folded_stacks(self):
+        self.addCleanup(shutil.rmtree, PROFILE_DIR, ignore_errors=True)
+        for _ in range(5):
+            cache.clear()
+            self.client.get(reverse('index'))
+        with open(os.path.join(PROFILE_DIR, 'index.folded')) as profile:
+            lines = profile.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn(';', stack)
+        self.assertGreater(int(count), 0)
+
+
+class QueryLogTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='logged')
+        for i in range(6):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fingerprint_collapses_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND "
+                        "name = 'x'  LIMIT %s"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?')
+
+    @override_settings(QUERY_LOG_REPEAT_THRESHOLD=5)
+    def test_repeated_template_lookup_is_flagged(self):
+        template = engines['django'].from_string(
+            '{% for post in posts %}\n{{ post.author.username }}\n'
+            '{% endfor %}')
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            template.render({'posts': list(Post.objects.all())})
+        repeated = log.repeated()
+        self.assertEqual(len(repeated), 1)
+        (sql, source, line), entry = repeated.popitem()
+        self.assertIn('auth_user', sql)
+        self.assertEqual(entry['calls'], 6)
+        self.assertTrue(line.endswith(':2'))
+
+    @override_settings(QUERY_LOG_ENABLED=True, QUERY_LOG_FILE=os.path.join(
+        PROFILE_DIR, 'logs', 'queries.log'))
+    def test_middleware_logs_and_aggregates(self):
+        self.addCleanup(shutil.rmtree, PROFILE_DIR, ignore_errors=True)
+        with self.assertLogs('monitoring.queries', 'INFO') as logs:
+            self.client.get(reverse('index'))
+            cache.clear()
+            self.client.get(reverse('index'))
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report['view'], 'index')
+        self.assertTrue(report['fingerprints'])
+        stat = QueryStat.objects.filter(view='index').first()
+        self.assertEqual(stat.requests, 2)
+        self.assertTrue(stat.source.startswith('posts/'))
+
+
+def _count_in_child(directory):
+    with override_settings(METRICS_DIR=directory):
+        metrics.CACHE_REQUESTS.inc(cache='page', result='hit')
+        metrics.THUMBNAIL_SECONDS.observe(1)
+
+
+@override_settings(METRICS_TOKEN='scraper')
+class MetricsTests(TestCase):
+
+    def scrape(self, token='scraper'):
+        return self.client.get('/metrics',
+                               HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def files(self):
+        return [name for name in os.listdir(self.directory)
+                if name.endswith('.metrics')]
+
+    def sample(self, line_start):
+        lines = metrics.exposition().splitlines()
+        values = [line.rsplit(' ', 1)[1] for line in lines
+                  if line.startswith(line_start)]
+        return values[0] if values else None
+
+    def test_processes_are_summed(self):
+        metrics.CACHE_REQUESTS.inc(cache='page', result='hit')
+        child = multiprocessing.get_context('fork').Process(
+            target=_count_in_child, args=(self.directory,))
+        child.start()
+        child.join()
+        self.assertEqual(len(self.files()), 2)
+        self.assertEqual(self.sample(
+            'yatube_cache_requests_total{cache="page",result="hit"}'), '2')
+
+    def test_dead_processes_are_merged_not_dropped(self):
+        for _ in range(2):
+            child = multiprocessing.get_context('fork').Process(
+                target=_count_in_child, args=(self.directory,))
+            child.start()
+            child.join()
+        # The second child merged the file of the first one on start.
+        self.assertIn(metrics.MERGED, self.files())
+        self.assertEqual(len(self.files()), 2)
+        self.assertEqual(self.sample(
+            'yatube_cache_requests_total{cache="page",result="hit"}'), '2')
+        self.assertEqual(self.sample('yatube_thumbnail_seconds_count'), '2')
+        self.assertEqual(self.sample(
+            'yatube_thumbnail_seconds_bucket{le="1.0"}'), '2')
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.003, 0.02, 20):
+            metrics.THUMBNAIL_SECONDS.observe(value)
+        self.assertEqual(self.sample(
+            'yatube_thumbnail_seconds_bucket{le="0.005"}'), '1')
+        self.assertEqual(self.sample(
+            'yatube_thumbnail_seconds_bucket{le="0.025"}'), '2')
+        self.assertEqual(self.sample(
+            'yatube_thumbnail_seconds_bucket{le="+Inf"}'), '3')
+        self.assertEqual(self.sample('yatube_thumbnail_seconds_count'), '3')
+
+    def test_file_grows_past_initial_size(self):
+        for index in range(3000):
+            metrics.REQUEST_QUERIES.observe(1, view=f'view_{index}')
+        self.assertEqual(self.sample(
+            'yatube_request_queries_count{view="view_2999"}'), '1')
+
+    def test_endpoint_reports_requests_and_cache(self):
+        user = User.objects.create_user(username='measured')
+        Post.objects.create(text='Пост', author=user)
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 2', body)
+        self.assertIn(
+            'yatube_cache_requests_total{cache="page",result="hit"} 1', body)
+        self.assertIn(
+            'yatube_cache_requests_total{cache="fragment",result="miss"} 1',
+            body)
+
+    def test_endpoint_needs_the_token(self):
+        # Behind a proxy on the same host every request comes from
+        # loopback, so the address grants nothing.
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.scrape('wrong').status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.scrape('').status_code, 403)
@@ -0,0 +1,63 @@
+"""Per-request timers that instrumented code reports into.
+
+The middleware starts a `Timer` for the current thread; the database
+wrapper, the template backend, the cache backends and thumbnailing wrap
+their work in `measure(category)`. Outside a request `measure` does
+nothing, so background threads and commands pay no cost.
+"""
+import contextlib
+import threading
+import time
+
+_local = threading.local()
+
+
+class Timer:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self._depth = {}
+
+    def add(self, category, seconds):
+        self.durations[category] = self.durations.get(category, 0) + seconds
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def start():
+    _local.timer = Timer()
+    return _local.timer
+
+
+def stop():
+    timer = getattr(_local, 'timer', None)
+    _local.timer = None
+    return timer
+
+
+def current():
+    return getattr(_local, 'timer', None)
+
+
+@contextlib.contextmanager
+def measure(category):
+    timer = current()
+    if timer is None:
+        yield
+        return
+    # Nested calls of one category (an include rendered inside a page,
+    # cache.get calling get_many) are counted once, by the outermost.
+    depth = timer._depth.get(category, 0)
+    timer._depth[category] = depth + 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer._depth[category] = depth
+        if depth == 0:
+            timer.add(category, time.perf_counter() - started)
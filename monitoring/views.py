@@ -0,0 +1,24 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from monitoring import metrics
+
+
+def _authorized(request):
+    # REMOTE_ADDR is the proxy's address behind nginx, so the scraper has
+    # to present METRICS_TOKEN; without one the endpoint stays closed.
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(header.encode(),
+                                               f'Bearer {token}'.encode())
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for requests bearing METRICS_TOKEN."""
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
@@ -1,13 +1,30 @@
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
+
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
+class FullTextSearchMixin:
+    """Look the search term up in the FTS index instead of LIKE '%term%'."""
+    fts_ids_sql = None
+
+    def get_search_results(self, request, queryset, search_term):
+        match = search.to_match(search_term)
+        if not match or not search.available():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        ids = RawSQL(self.fts_ids_sql, [match])
+        return queryset.filter(pk__in=ids), False
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("pk", "text", "pub_date", "author")
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
+    fts_ids_sql = search.POST_IDS_SQL
 
 
 @admin.register(Group)
@@ -19,10 +36,11 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('post_id', 'author', 'text', 'created',)
-    search_fields = ('text', 'author',)
+    search_fields = ('text',)
     list_filter = ('created',)
+    fts_ids_sql = search.COMMENT_IDS_SQL
 
 
 @admin.register(Follow)
@@ -0,0 +1,219 @@
+"""Read-only JSON versions of the feeds and of the post page.
+
+Rows are read with `values()` for just the requested fields and turned
+into dicts directly, so a page costs one query and no model instances
+or templates. Pages continue with the cursor from `next` (`?before=` for
+feeds, `?after=` for comments); `?fields=id,text` limits each post to
+the listed fields.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
+
+from posts import reactions
+from posts.cache import cache_page_by_tags
+from posts.models import Comment, Group, Post, User
+from posts.pagination import (decode_cursor, encode_cursor, newer_than,
+                              older_than)
+from posts.timeline import feed_for
+from sorl.thumbnail.default import storage as thumbnail_storage
+from yatube.query_budget import query_budget
+from yatube.replicas import replica_safe
+
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# Output field -> column read for it.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'comments_count': 'comments_count',
+    'likes': 'likes',
+    'views': 'views',
+    'image': 'image',
+    'thumbnail': 'thumbnail',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'parent': 'parent_id',
+}
+FILE_URLS = {'image': default_storage.url, 'thumbnail': thumbnail_storage.url}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder,
+                        json_dumps_params={'ensure_ascii': False,
+                                           'separators': (',', ':')})
+
+
+def api_view(view):
+    """Turn Http404 and ApiError into JSON error responses."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return _json({'error': 'Не найдено'}, status=404)
+        except ApiError as error:
+            return _json({'error': str(error)}, status=error.status)
+    return wrapper
+
+
+def _fields(request, available):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    names = [name for name in requested.split(',') if name]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise ApiError('Неизвестные поля: ' + ', '.join(sorted(unknown)))
+    return names
+
+
+def _limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', PER_PAGE)), 1),
+                   MAX_PER_PAGE)
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+
+
+def _item(row, names, columns):
+    item = {}
+    for name in names:
+        value = row[columns[name]]
+        if name in FILE_URLS:
+            value = FILE_URLS[name](value) if value else None
+        item[name] = value
+    return item
+
+
+def _page(request, queryset, columns, names, field='pub_date',
+          tiebreak='pk', newest_first=True):
+    """One page ordered by (`field`, `tiebreak`) and the cursor after it."""
+    limit = _limit(request)
+    param, follow = (('before', older_than) if newest_first
+                     else ('after', newer_than))
+    token = request.GET.get(param)
+    if token is None:
+        order = '-' if newest_first else ''
+        queryset = queryset.order_by(f'{order}{field}', f'{order}{tiebreak}')
+    else:
+        cursor = decode_cursor(token)
+        if cursor is None:
+            raise ApiError('Неверный курсор')
+        queryset = follow(queryset, field, cursor, tiebreak)
+    # The cursor columns are read even when they are not in `fields`.
+    selected = dict.fromkeys([field, tiebreak,
+                              *(columns[name] for name in names)])
+    rows = list(queryset.values(*selected)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][field], rows[-1][tiebreak])
+    return {'results': [_item(row, names, columns) for row in rows],
+            'next': next_cursor}
+
+
+def _feed(request, queryset, missing=None):
+    queryset = queryset.annotate(likes=reactions.likes())
+    data = _page(request, queryset, POST_FIELDS,
+                 _fields(request, POST_FIELDS))
+    # Only an empty page needs to tell "no posts" from "no such page".
+    if not data['results'] and missing is not None and not missing.exists():
+        raise Http404
+    return _json(data)
+
+
+@replica_safe
+@query_budget(3)
+@cache_page_by_tags(lambda: ['feed'],
+                    timeout=settings.FEED_PAGE_CACHE_TIMEOUT)
+@api_view
+def posts(request):
+    return _feed(request, Post.objects.all())
+
+
+@replica_safe
+@query_budget(4)
+@cache_page_by_tags(lambda slug: [f'group:{slug}'],
+                    timeout=settings.FEED_PAGE_CACHE_TIMEOUT)
+@api_view
+def group_posts(request, slug):
+    return _feed(request, Post.objects.filter(group__slug=slug),
+                 missing=Group.objects.filter(slug=slug))
+
+
+@replica_safe
+@query_budget(4)
+@cache_page_by_tags(lambda username: [f'author:{username}'],
+                    timeout=settings.FEED_PAGE_CACHE_TIMEOUT)
+@api_view
+def profile_posts(request, username):
+    return _feed(request, Post.objects.filter(author__username=username),
+                 missing=User.objects.filter(username=username))
+
+
+@replica_safe
+@query_budget(3)
+@cache_page_by_tags(lambda: ['feed'], timeout=60)
+@api_view
+def popular_posts(request):
+    """The most viewed posts; views are flushed in batches, and the
+    page only depends on them, so it is cached for a minute."""
+    names = _fields(request, POST_FIELDS)
+    rows = (Post.objects.annotate(likes=reactions.likes())
+            .order_by('-views', '-id')
+            .values(*dict.fromkeys(POST_FIELDS[name] for name in names))
+            [:_limit(request)])
+    return _json({'results': [_item(row, names, POST_FIELDS)
+                              for row in rows]})
+
+
+@replica_safe
+@query_budget(3)
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужно войти', status=401)
+    queryset = feed_for(request.user).annotate(likes=reactions.likes())
+    return _json(_page(request, queryset, POST_FIELDS,
+                       _fields(request, POST_FIELDS), field='feed_date',
+                       tiebreak='feed_post'))
+
+
+@replica_safe
+@query_budget(4)
+@cache_page_by_tags(lambda post_id: [f'post:{post_id}'])
+@api_view
+def post_detail(request, post_id):
+    names = _fields(request, POST_FIELDS)
+    row = (Post.objects.filter(pk=post_id)
+           .annotate(likes=reactions.likes())
+           .values(*dict.fromkeys(POST_FIELDS[name] for name in names))
+           .first())
+    if row is None:
+        raise Http404
+    comments = _page(request, Comment.objects.filter(post_id=post_id),
+                     COMMENT_FIELDS, list(COMMENT_FIELDS), field='created',
+                     newest_first=False)
+    return _json({**_item(row, names, POST_FIELDS),
+                  'comments': comments['results'],
+                  'comments_next': comments['next']})
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.posts, name='posts'),
+    path('posts/popular/', api.popular_posts, name='popular_posts'),
+    path('posts/<int:post_id>/', api.post_detail, name='post_detail'),
+    path('groups/<slug:slug>/posts/', api.group_posts, name='group_posts'),
+    path('users/<username>/posts/', api.profile_posts, name='profile_posts'),
+    path('follow/posts/', api.follow_posts, name='follow_posts'),
+]
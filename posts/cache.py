@@ -0,0 +1,138 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from monitoring.metrics import CACHE_REQUESTS
+
+BYPASS_SESSION_KEY = 'page_cache_bypass_until'
+SITE_TAG = 'site'
+
+
+def _tag_key(tag):
+    return f'page_tag:{tag}'
+
+
+def _fresh_generation():
+    # Time based, so a tag that was evicted from the cache never comes back
+    # with a generation that old page entries were stored under.
+    return int(time.time() * 1000)
+
+
+def generations(tags):
+    keys = [_tag_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    missing = {key: _fresh_generation() for key in keys if key not in found}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(key, 0) for key in keys]
+
+
+def invalidate(*tags):
+    for tag in set(tags):
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            cache.set(_tag_key(tag), _fresh_generation(), None)
+
+
+def post_tags(post):
+    tags = ['feed', f'post:{post.pk}', f'author:{post.author.username}']
+    if post.group_id is not None:
+        tags.append(f'group:{post.group.slug}')
+    return tags
+
+
+def mark_write(request):
+    """Let the writer skip the page cache for a short while."""
+    request.session[BYPASS_SESSION_KEY] = (
+        time.time() + settings.PAGE_CACHE_BYPASS_SECONDS)
+
+
+def _bypass(request):
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    if not request.user.is_authenticated:
+        return False
+    return request.session.get(BYPASS_SESSION_KEY, 0) > time.time()
+
+
+def _page_key(request, tags):
+    user = request.user
+    viewer = 'anon'
+    if user.is_authenticated:
+        # The CSRF cookie is part of the key: forms in the cached page must
+        # carry a token that is valid for this browser.
+        csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        viewer = f'{user.pk}:{csrf}'
+    gens = generations([SITE_TAG, *tags])
+    raw = '|'.join([request.get_full_path(), viewer, *map(str, gens)])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _etag(digest, modified):
+    # A page that expired (rather than was invalidated) is rendered again
+    # under the same digest and may differ, so the render time is part
+    # of the tag.
+    return quote_etag(f'{digest}-{modified}')
+
+
+def _set_validators(response, digest, modified):
+    response['ETag'] = _etag(digest, modified)
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def cache_page_by_tags(get_tags, timeout=None):
+    """Cache a view's response until one of its tags is invalidated.
+
+    `get_tags` receives the view arguments and returns the tags the page
+    depends on; writes call `invalidate()` with the affected tags. The
+    page key and render time make up the ETag, so a client that already
+    has the cached page gets a 304 without the view running.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if _bypass(request):
+                return view(request, *args, **kwargs)
+            digest = _page_key(request, get_tags(*args, **kwargs))
+            # v2 entries also hold the time the page was rendered.
+            key = f'page:v2:{digest}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type, modified = cached
+                not_modified = get_conditional_response(
+                    request, etag=_etag(digest, modified),
+                    last_modified=modified)
+                if not_modified is not None:
+                    CACHE_REQUESTS.inc(cache='page', result='not_modified')
+                    return _set_validators(not_modified, digest, modified)
+                CACHE_REQUESTS.inc(cache='page', result='hit')
+                return _set_validators(
+                    HttpResponse(content, content_type=content_type),
+                    digest, modified)
+            CACHE_REQUESTS.inc(cache='page', result='miss')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                modified = int(time.time())
+                _set_validators(response, digest, modified)
+                lifetime = timeout or settings.PAGE_CACHE_TIMEOUT
+                if getattr(request, 'db_replica', None):
+                    # A lagging replica may miss the write that bumped
+                    # the tags, so do not keep its page for long.
+                    lifetime = min(lifetime,
+                                   settings.REPLICA_PAGE_CACHE_TIMEOUT)
+                cache.set(key, (response.content, response['Content-Type'],
+                                modified), lifetime)
+            return response
+        return wrapper
+    return decorator
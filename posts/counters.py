@@ -0,0 +1,70 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+BATCH_SIZE = 500
+
+
+def comment_added(post_id):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + 1, version=F('version') + 1)
+
+
+def comment_removed(post_id):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') - 1, 0),
+        version=F('version') + 1)
+
+
+def bump_versions(**filters):
+    return Post.objects.filter(**filters).update(version=F('version') + 1)
+
+
+def _count(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')), 0)
+
+
+def recount_comments(**filters):
+    return Post.objects.filter(**filters).update(
+        comments_count=_count(Comment, 'post'))
+
+
+def bump_stats(user_id, **deltas):
+    changes = {field: Greatest(F(field) + delta, 0)
+               for field, delta in deltas.items()}
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if stats.update(**changes) or min(deltas.values()) < 0:
+        # A missing row is left for recount_author_stats when decrementing:
+        # it may belong to a user that is being deleted right now.
+        return
+    AuthorStats.objects.get_or_create(user_id=user_id)
+    stats.update(**changes)
+
+
+def recount_author_stats(user_ids=None):
+    stats = AuthorStats.objects.all()
+    if user_ids is None:
+        user_ids = (User.objects.order_by('pk')
+                    .values_list('pk', flat=True).iterator(
+                        chunk_size=BATCH_SIZE))
+    else:
+        stats = stats.filter(user_id__in=user_ids)
+    batch = []
+    for user_id in user_ids:
+        batch.append(AuthorStats(user_id=user_id))
+        if len(batch) == BATCH_SIZE:
+            AuthorStats.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    AuthorStats.objects.bulk_create(batch, ignore_conflicts=True)
+    return stats.update(
+        followers=_count(Follow, 'author', 'user_id'),
+        following=_count(Follow, 'user', 'user_id'),
+        posts=_count(Post, 'author', 'user_id'),
+        comments=_count(Comment, 'author', 'user_id'),
+    )
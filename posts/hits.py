@@ -0,0 +1,139 @@
+"""Post view counts, buffered in memory and written in batches.
+
+Every worker process adds views to its own counter. A daemon thread,
+started by `start_flusher()` in the WSGI entry point, writes it every
+VIEW_FLUSH_SECONDS seconds, or as soon as VIEW_FLUSH_EVENTS views are
+buffered, as one UPDATE that adds each post's increment to the stored
+value; requests never wait for that write. Adding instead of overwriting
+keeps flushes from several processes correct without any locking. What
+is still buffered when the process exits normally is flushed by an
+atexit hook. A flush invalidates the pages of the posts it wrote, so a
+cached post page is at most one flush behind.
+
+Views are buffered per database and only written to the one they were
+counted on, so views seen by a test run never reach the development
+database. Tests turn buffering off with VIEW_BUFFER_ENABLED.
+"""
+import atexit
+import collections
+import logging
+import os
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, DatabaseError,
+                       close_old_connections, connections)
+from django.db.models import Case, F, IntegerField, Value, When
+
+from posts.cache import invalidate
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_wake = threading.Event()
+# (database name, post id) -> views not written yet.
+_pending = collections.Counter()
+_state = {'pid': os.getpid(), 'events': 0, 'flusher': False}
+
+
+def _database():
+    # The test runner points the connection at its own database without
+    # sending any signal, so the name is read on every use.
+    return connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+
+def _forked():
+    # Called with the lock held. The parent's buffer is the parent's to
+    # flush, and its flusher thread did not come along.
+    if _state['pid'] == os.getpid():
+        return False
+    _pending.clear()
+    _state.update(pid=os.getpid(), events=0)
+    return True
+
+
+def record(post_id):
+    if not settings.VIEW_BUFFER_ENABLED:
+        return
+    with _lock:
+        if _forked() and _state['flusher']:
+            _start_thread()
+        _pending[_database(), post_id] += 1
+        _state['events'] += 1
+        if _state['events'] >= settings.VIEW_FLUSH_EVENTS:
+            _wake.set()
+
+
+def flush():
+    """Write the buffered views; return how many posts were updated."""
+    database = _database()
+    with _lock:
+        if _forked():
+            return 0
+        batch = {post_id: views for (name, post_id), views
+                 in _pending.items() if name == database}
+        # Views counted on another database (a finished test run) are
+        # dropped rather than added to unrelated posts.
+        _pending.clear()
+        _state['events'] = 0
+    if not batch:
+        return 0
+    increment = Case(*[When(pk=pk, then=Value(views))
+                       for pk, views in batch.items()],
+                     default=Value(0), output_field=IntegerField())
+    try:
+        # Past the router on purpose: views always go to the primary.
+        updated = Post.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk__in=batch).update(views=F('views') + increment)
+    except DatabaseError:
+        # Keep the views for the next flush rather than losing them.
+        with _lock:
+            _pending.update({(database, pk): views
+                             for pk, views in batch.items()})
+        logger.exception('Could not flush %d post views', sum(batch.values()))
+        return 0
+    invalidate(*(f'post:{pk}' for pk in batch))
+    return updated
+
+
+def _flush_periodically():
+    while True:
+        _wake.wait(settings.VIEW_FLUSH_SECONDS)
+        _wake.clear()
+        try:
+            flush()
+        finally:
+            close_old_connections()
+
+
+def _start_thread():
+    threading.Thread(target=_flush_periodically, name='post-views',
+                     daemon=True).start()
+
+
+def start_flusher():
+    """Flush the buffer from a background thread of this process and of
+    the processes forked from it."""
+    if not settings.VIEW_BUFFER_ENABLED:
+        return
+    with _lock:
+        if not _state['flusher'] or _forked():
+            _state['flusher'] = True
+            _start_thread()
+
+
+def counts_views(view):
+    """Count successful GETs of a post page, cached and not modified
+    responses included."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record(kwargs['post_id'])
+        return response
+    return wrapper
+
+
+atexit.register(flush)
@@ -0,0 +1,85 @@
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from yatube.sqlite_cache import SQLiteCache
+
+PAGE = b'x' * 20000
+
+
+def make_backend(name, location):
+    if name == 'locmem':
+        return LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    if name == 'filebased':
+        return FileBasedCache(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    return SQLiteCache(os.path.join(location, 'cache.sqlite3'),
+                       {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def worker(name, location, operations, keys, seed, results):
+    cache = make_backend(name, location)
+    rng = random.Random(seed)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f'page:{rng.randrange(keys)}'
+        if cache.get(key) is None:
+            cache.set(key, PAGE, 300)
+        else:
+            hits += 1
+    results.put((hits, time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает LocMemCache, FileBasedCache и SQLiteCache '
+            'при нескольких процессах-воркерах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+',
+                            default=[1, 2, 4, 8])
+        parser.add_argument('--operations', type=int, default=5000,
+                            help='операций на воркер')
+        parser.add_argument('--keys', type=int, default=500,
+                            help='число различных ключей (страниц)')
+        parser.add_argument('--backends', nargs='+',
+                            default=['locmem', 'filebased', 'sqlite'])
+
+    def handle(self, *args, **options):
+        report = []
+        for name in options['backends']:
+            for workers in options['workers']:
+                report.append(self.run(name, workers, options))
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, name, workers, options):
+        with tempfile.TemporaryDirectory() as location:
+            results = multiprocessing.Queue()
+            processes = [
+                multiprocessing.Process(
+                    target=worker,
+                    args=(name, location, options['operations'],
+                          options['keys'], seed, results))
+                for seed in range(workers)]
+            started = time.perf_counter()
+            for process in processes:
+                process.start()
+            outcomes = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - started
+        total = workers * options['operations']
+        hits = sum(hits for hits, _ in outcomes)
+        return {
+            'backend': name,
+            'workers': workers,
+            'ops_per_sec': round(total / elapsed),
+            'hit_rate': round(hits / total, 3),
+            'slowest_worker_sec': round(max(t for _, t in outcomes), 3),
+        }
@@ -0,0 +1,59 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+from django.test import RequestFactory
+
+from posts.models import Post
+from posts.pagination import paginate
+from posts.templatetags.post_cards import card_key
+
+
+class Command(BaseCommand):
+    help = ('Замеряет отрисовку шаблона index.html с N постами, '
+            'загруженными заранее; результат в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10,
+                            help='постов на странице')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='сколько раз отрисовать страницу')
+        parser.add_argument('--cold', action='store_true',
+                            help='сбрасывать кэш карточек перед каждой '
+                                 'отрисовкой')
+
+    def handle(self, *args, **options):
+        count, repeat = options['posts'], options['repeat']
+        if count < 1 or repeat < 1:
+            raise CommandError('--posts и --repeat должны быть больше 0')
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = paginate(request, Post.objects.select_related(
+            'author', 'group'), per_page=count)
+        posts = list(context['page'])
+        if not posts:
+            raise CommandError('Нет постов, запустите seed_benchmark')
+        template = get_template('main_templates/index.html')
+        keys = [card_key(post) for post in posts]
+        # The first render parses the templates and fills the caches.
+        template.render(context, request)
+        timings = []
+        for _ in range(repeat):
+            if options['cold']:
+                cache.delete_many(keys)
+            started = time.perf_counter()
+            template.render(context, request)
+            timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        self.stdout.write(json.dumps({
+            'posts': len(posts),
+            'renders': repeat,
+            'cold_cards': options['cold'],
+            'median_ms': round(median * 1000, 3),
+            'max_ms': round(max(timings) * 1000, 3),
+            'per_post_us': round(median / len(posts) * 10 ** 6, 1),
+        }, indent=2))
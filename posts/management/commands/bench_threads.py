@@ -0,0 +1,80 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.models import COMMENT_MAX_DEPTH, Comment, Post, User
+from yatube.query_budget import QueryCounter
+
+
+def load_recursive(post, parent=None):
+    """The naive way: one query for the replies of every comment."""
+    tree = []
+    replies = (Comment.objects.filter(post=post, parent=parent)
+               .select_related('author').order_by('pk'))
+    for comment in replies:
+        tree.append(comment)
+        tree.extend(load_recursive(post, comment))
+    return tree
+
+
+def load_by_path(post):
+    return list(Comment.objects.filter(post=post)
+                .select_related('author').order_by('path'))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает загрузку дерева комментариев рекурсивными '
+            'запросами и одним запросом по materialized path; '
+            'временные данные откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=2000,
+                            help='комментариев в дереве')
+        parser.add_argument('--roots', type=int, default=50,
+                            help='из них верхнего уровня')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not 0 < options['roots'] <= options['comments']:
+            raise CommandError('Нужно 0 < --roots <= --comments')
+        with transaction.atomic():
+            post = self.build_tree(random.Random(options['seed']), options)
+            report = [self.measure(name, loader, post, options['repeat'])
+                      for name, loader in (('recursive', load_recursive),
+                                           ('path', load_by_path))]
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def build_tree(self, rng, options):
+        author, _ = User.objects.get_or_create(username='bench_threads')
+        post = Post.objects.create(text='Дерево комментариев', author=author)
+        # Comments that can still get replies below them.
+        parents = []
+        for number in range(options['comments']):
+            parent = None
+            if number >= options['roots']:
+                parent = rng.choice(parents)
+            comment = Comment.objects.create(
+                post=post, author=author, parent=parent,
+                text=f'Комментарий {number}')
+            if comment.depth < COMMENT_MAX_DEPTH:
+                parents.append(comment)
+        return post
+
+    def measure(self, name, loader, post, repeat):
+        timings = []
+        counter = QueryCounter()
+        for _ in range(repeat):
+            counter.count = 0
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                rows = loader(post)
+            timings.append(time.perf_counter() - started)
+        return {'loader': name, 'comments': len(rows),
+                'queries': counter.count,
+                'median_ms': round(statistics.median(timings) * 1000, 3)}
@@ -0,0 +1,193 @@
+import html
+import json
+import random
+import re
+import statistics
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from yatube.query_budget import QueryCounter
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_view', 'follow_index')
+# The enabled "next page" link of includes/paginator.html.
+NEXT_LINK = re.compile(r'href="([^"#]+)">\s*Следующая')
+
+
+def next_page(path, body):
+    match = NEXT_LINK.search(body)
+    if match is None:
+        return None
+    return path.split('?')[0] + html.unescape(match.group(1))
+
+
+def percentile(values, share):
+    """The value below which `share` of `values` lie, None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def percentile_ms(values, share):
+    value = percentile(values, share)
+    return 'n/a' if value is None else round(value * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест страниц index, group_posts, profile, '
+            'post_view и follow_index; результат в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', nargs='+', default=list(VIEWS),
+                            choices=VIEWS)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='запросов на каждую страницу')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--mode', choices=('client', 'http'),
+                            default='client',
+                            help='client — тестовый клиент Django в этом '
+                                 'процессе, http — запущенный сервер')
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='адрес сервера для режима http')
+        parser.add_argument('--pages', type=int, default=3,
+                            help='сколько страниц ленты пролистывать по '
+                                 'курсорным ссылкам «Следующая»')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        reader = (User.objects.filter(follower__isnull=False)
+                  .order_by('pk').first())
+        paths = {name: self.paths(name, rng, options)
+                 for name in options['views']}
+        if not all(paths.values()):
+            raise CommandError('В базе нет данных, запустите seed_benchmark')
+        session = None
+        if reader is not None:
+            login = Client()
+            login.force_login(reader)
+            session = login.cookies[settings.SESSION_COOKIE_NAME].value
+        report = [self.run(name, paths[name], session, options)
+                  for name in options['views']]
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def paths(self, name, rng, options):
+        """First pages to request; later pages are reached by following
+        the cursor links of the responses."""
+        count = options['requests']
+        if name in ('index', 'follow_index'):
+            return [reverse(name)] * count
+        if name == 'group_posts':
+            slugs = list(Group.objects.values_list('slug', flat=True))
+            return [reverse(name, args=[rng.choice(slugs)])
+                    for _ in range(count)] if slugs else []
+        if name == 'profile':
+            names = list(User.objects.filter(posts__isnull=False)
+                         .distinct().values_list('username', flat=True)[:1000])
+            return [reverse(name, args=[rng.choice(names)])
+                    for _ in range(count)] if names else []
+        posts = list(Post.objects.order_by('-pk')
+                     .values_list('author__username', 'pk')[:1000])
+        return [reverse(name, args=rng.choice(posts))
+                for _ in range(count)] if posts else []
+
+    def run(self, name, paths, session, options):
+        work = queue.Queue()
+        for path in paths:
+            work.put(path)
+        results = []
+        budget = {'left': options['requests']}
+        lock = threading.Lock()
+
+        def take():
+            with lock:
+                budget['left'] -= 1
+                return budget['left'] >= 0
+
+        def worker():
+            client = None
+            if options['mode'] == 'client':
+                client = Client()
+                if session:
+                    client.cookies[settings.SESSION_COOKIE_NAME] = session
+            while True:
+                try:
+                    path = work.get_nowait()
+                except queue.Empty:
+                    break
+                for _ in range(options['pages']):
+                    if path is None or not take():
+                        break
+                    if client is not None:
+                        *result, body = self.fetch_client(client, path)
+                    else:
+                        *result, body = self.fetch_http(path, session,
+                                                        options['url'])
+                    results.append(result)
+                    path = next_page(path, body)
+
+        def thread_worker():
+            worker()
+            connection.close()
+
+        started = time.perf_counter()
+        if options['concurrency'] == 1:
+            worker()
+        else:
+            threads = [threading.Thread(target=thread_worker)
+                       for _ in range(options['concurrency'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, _, _ in results]
+        queries = [count for _, _, count in results if count is not None]
+        return {
+            'view': name,
+            'mode': options['mode'],
+            'requests': len(results),
+            'concurrency': options['concurrency'],
+            'errors': sum(1 for _, status, _ in results if status != 200),
+            'throughput_rps': round(len(results) / elapsed, 1),
+            'p50_ms': percentile_ms(latencies, 0.50),
+            'p95_ms': percentile_ms(latencies, 0.95),
+            'p99_ms': percentile_ms(latencies, 0.99),
+            'queries_per_request': (round(statistics.mean(queries), 2)
+                                    if queries else None),
+        }
+
+    def fetch_client(self, client, path):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = client.get(path)
+        elapsed = time.perf_counter() - started
+        return (elapsed, response.status_code, counter.count,
+                response.content.decode())
+
+    def fetch_http(self, path, session, base_url):
+        request = urllib.request.Request(base_url.rstrip('/') + path)
+        if session:
+            request.add_header(
+                'Cookie', f'{settings.SESSION_COOKIE_NAME}={session}')
+        started = time.perf_counter()
+        body = ''
+        try:
+            with urllib.request.urlopen(request) as response:
+                body = response.read().decode()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        return time.perf_counter() - started, status, None, body
@@ -0,0 +1,91 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.cache import BYPASS_SESSION_KEY
+from posts.models import Follow, Group, Post
+from posts.pagination import encode_cursor
+
+# Plain table scans and sorts in a temporary B-tree; scans that walk an
+# index ("SCAN t USING INDEX i") and virtual (FTS) tables are fine.
+BAD_PLAN = re.compile(r'^SCAN (TABLE )?\w+$|USE TEMP B-TREE')
+
+
+class Recorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT') and not many:
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Проверяет планы (EXPLAIN QUERY PLAN) запросов страниц-лент и '
+            'поста: ни полного сканирования таблиц, ни сортировки во '
+            'временном B-дереве')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда понимает только планы SQLite')
+        follow = Follow.objects.select_related('user').first()
+        post = Post.objects.select_related('author').first()
+        group = Group.objects.filter(posts__isnull=False).first()
+        if not (follow and post and group):
+            raise CommandError('Нужны хотя бы один пост в группе и одна '
+                               'подписка, запустите seed_benchmark')
+        client = Client()
+        client.force_login(follow.user)
+        # Skip the page cache so every view runs its queries.
+        session = client.session
+        session[BYPASS_SESSION_KEY] = float('inf')
+        session.save()
+        try:
+            failures = 0
+            for path in self.paths(post, group):
+                failures += self.check_path(client, path)
+        finally:
+            client.logout()
+        if failures:
+            raise CommandError(f'Плохих планов: {failures}')
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
+
+    def paths(self, post, group):
+        lists = [reverse('index'), reverse('follow_index'),
+                 reverse('group_posts', args=[group.slug]),
+                 reverse('profile', args=[post.author.username])]
+        cursor = encode_cursor(post.pub_date, post.pk)
+        for path in lists:
+            yield path
+            yield f'{path}?page=2'
+            yield f'{path}?before={cursor}'
+            yield f'{path}?after={cursor}'
+        args = [post.author.username, post.pk]
+        yield reverse('post_view', args=args)
+        yield f"{reverse('post_comments', args=args)}?before={cursor}"
+
+    def check_path(self, client, path):
+        recorder = Recorder()
+        with connection.execute_wrapper(recorder):
+            response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: ответ {response.status_code}')
+        failures = 0
+        with connection.cursor() as cursor:
+            for sql, params in recorder.queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                details = [row[-1] for row in cursor.fetchall()]
+                bad = [detail for detail in details
+                       if BAD_PLAN.search(detail)]
+                if bad or self.verbosity > 1:
+                    self.stdout.write(f'{path}\n  {sql}')
+                    for detail in details:
+                        marker = '!!' if detail in bad else '  '
+                        self.stdout.write(f'  {marker} {detail}')
+                failures += bool(bad)
+        return failures
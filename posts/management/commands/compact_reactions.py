@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.reactions import compact
+
+
+class Command(BaseCommand):
+    help = ('Сводит шарды счётчиков лайков каждого поста в одну строку '
+            '(запускать периодически, например из cron)')
+
+    def handle(self, *args, **options):
+        compacted = compact()
+        self.stdout.write(self.style.SUCCESS(
+            f'Сжато постов: {compacted}'))
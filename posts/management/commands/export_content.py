@@ -0,0 +1,28 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в файл '
+            'NDJSON (построчный JSON)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл (.gz — со сжатием) или -')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='строк, читаемых из базы за раз')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = 0
+        with transfer.open_dump(options['path'], 'w') as handle:
+            for record in transfer.export_records(options['chunk_size']):
+                handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+                rows += 1
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено записей: {rows} за {elapsed:.1f} с '
+            f'({rows / max(elapsed, 1e-9):.0f} в секунду)'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки из файла, '
+            'созданного export_content')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл (.gz — со сжатием) или -')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='строк в одном INSERT')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='записей в одной транзакции')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(counts):
+            if options['verbosity'] > 1:
+                self.stderr.write(self.format(counts, started))
+
+        with transfer.open_dump(options['path'], 'r') as handle:
+            counts = transfer.import_records(
+                transfer.read_records(handle),
+                batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'],
+                progress=progress)
+        self.stdout.write(self.style.SUCCESS(self.format(counts, started)))
+
+    @staticmethod
+    def format(counts, started):
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        details = ', '.join(f'{model}: {count}'
+                            for model, count in counts.items())
+        return (f'Загружено записей: {total} ({details}) за {elapsed:.1f} с, '
+                f'{total / max(elapsed, 1e-9):.0f} в секунду')
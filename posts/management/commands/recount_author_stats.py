@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику авторов (подписки, посты, комментарии)'
+
+    def handle(self, *args, **options):
+        updated = recount_author_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено авторов: {updated}'))
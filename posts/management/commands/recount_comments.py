@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_comments
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у всех постов'
+
+    def handle(self, *args, **options):
+        updated = recount_comments()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {updated}'))
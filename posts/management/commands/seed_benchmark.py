@@ -0,0 +1,158 @@
+import datetime as dt
+import io
+import itertools
+import os
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+
+from posts import transfer
+from posts.models import User
+
+WORDS = ('лето море книга город кот дорога музыка утро друг дом сад '
+         'поезд письмо вечер река лес кофе небо снег ветер').split()
+IMAGE_COLORS = ('#d9534f', '#5cb85c', '#5bc0de', '#f0ad4e', '#337ab7')
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def write_images(count):
+    """Store a few JPEGs in MEDIA_ROOT for posts to share."""
+    names = []
+    directory = os.path.join(settings.MEDIA_ROOT, 'posts')
+    os.makedirs(directory, exist_ok=True)
+    for index in range(count):
+        name = f'posts/bench_{index}.jpg'
+        buffer = io.BytesIO()
+        color = IMAGE_COLORS[index % len(IMAGE_COLORS)]
+        Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+        with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as handle:
+            handle.write(buffer.getvalue())
+        names.append(name)
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных тестов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='среднее число подписок пользователя')
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='показатель степенного закона '
+                                 'популярности авторов')
+        parser.add_argument('--image-ratio', type=float, default=0.3,
+                            help='доля постов с картинкой')
+        parser.add_argument('--days', type=int, default=365,
+                            help='за сколько дней распределить посты')
+        parser.add_argument('--prefix', default='bench',
+                            help='префикс имён пользователей и групп')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rng = random.Random(options['seed'])
+        users = self.create_users(options)
+        # Posts are spread evenly: the first one's date and the step.
+        days = dt.timedelta(days=options['days'])
+        dates = (timezone.now() - days, days / max(options['posts'], 1))
+        records = itertools.chain(
+            self.groups(options),
+            self.posts(rng, list(users), dates, options),
+            self.comments(rng, list(users), dates, options),
+            self.follows(rng, list(users), options))
+        counts = transfer.import_records(
+            records, batch_size=options['batch_size'],
+            chunk_size=options['batch_size'] * 10, users=users)
+        elapsed = time.perf_counter() - started
+        counts = {'user': len(users), **counts}
+        details = ', '.join(f'{model}: {count}'
+                            for model, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {details} за {elapsed:.1f} с'))
+
+    def create_users(self, options):
+        prefix = options['prefix']
+        password = make_password(None)
+        names = [f'{prefix}_user_{index}' for index in range(options['users'])]
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in names],
+            batch_size=options['batch_size'], ignore_conflicts=True)
+        return dict(User.objects.filter(username__in=names)
+                    .values_list('username', 'pk'))
+
+    def groups(self, options):
+        for index in range(options['groups']):
+            slug = f'{options["prefix"]}-group-{index}'
+            yield {'model': 'group', 'slug': slug,
+                   'title': f'Группа {options["prefix"]} {index}',
+                   'description': f'Описание группы {index}'}
+
+    def author_weights(self, count, alpha):
+        # Zipf-like popularity: the author of rank r is followed and
+        # writes proportionally to 1 / r ** alpha.
+        return list(itertools.accumulate(
+            1 / (rank ** alpha) for rank in range(1, count + 1)))
+
+    def posts(self, rng, usernames, dates, options):
+        weights = self.author_weights(len(usernames), options['alpha'])
+        images = write_images(len(IMAGE_COLORS))
+        start, step = dates
+        for index in range(options['posts']):
+            group = None
+            if options['groups'] and rng.random() < 0.5:
+                group = (f'{options["prefix"]}-group-'
+                         f'{rng.randrange(options["groups"])}')
+            image = ''
+            if rng.random() < options['image_ratio']:
+                image = rng.choice(images)
+            yield {'model': 'post', 'id': index + 1,
+                   'text': sentence(rng, rng.randint(5, 60)),
+                   'pub_date': (start + step * index).isoformat(),
+                   'author': rng.choices(usernames, cum_weights=weights)[0],
+                   'group': group, 'image': image}
+
+    def comments(self, rng, usernames, dates, options):
+        if not options['posts']:
+            return
+        # Popular (recent) posts collect more comments.
+        weights = self.author_weights(options['posts'], 0.5)
+        start, step = dates
+        now = timezone.now()
+        for _ in range(options['comments']):
+            post = options['posts'] - rng.choices(
+                range(options['posts']), cum_weights=weights)[0]
+            # Any time between the post and now, so comments of a post
+            # are not in id order.
+            pub_date = start + step * (post - 1)
+            created = pub_date + (now - pub_date) * rng.random()
+            yield {'model': 'comment', 'post': post,
+                   'author': rng.choice(usernames),
+                   'text': sentence(rng, rng.randint(3, 20)),
+                   'created': created.isoformat()}
+
+    def follows(self, rng, usernames, options):
+        weights = self.author_weights(len(usernames), options['alpha'])
+        for user in usernames:
+            wanted = min(int(rng.expovariate(1 / options['follows'])),
+                         len(usernames) - 1)
+            authors = set()
+            while len(authors) < wanted:
+                author = rng.choices(usernames, cum_weights=weights)[0]
+                if author != user:
+                    authors.add(author)
+            for author in authors:
+                yield {'model': 'follow', 'user': user, 'author': author}
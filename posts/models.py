@@ -1,5 +1,9 @@
+import functools
+import operator
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from sorl.thumbnail.default import storage as thumbnail_storage
 
 User = get_user_model()
 
@@ -17,18 +21,126 @@ class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField('date published', auto_now_add=True,
                                     db_index=True)
+    # Looked up through the (author|group, date, id) indexes in Meta,
+    # which lead with these columns.
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name='posts')
+                               related_name='posts', db_index=False)
     group = models.ForeignKey(Group, on_delete=models.SET_NULL,
                               null=True, blank=True, verbose_name='Group',
-                              related_name='posts')
+                              related_name='posts', db_index=False)
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    thumbnail = models.CharField(max_length=255, blank=True, editable=False)
+    views = models.PositiveIntegerField(default=0, editable=False)
+
+    # Maintained with queryset updates elsewhere, so a plain save() must
+    # not write back the value that was loaded with the instance.
+    MANAGED_FIELDS = ('comments_count', 'version', 'thumbnail', 'views')
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['-views', '-id'], name='post_views_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded group so moving the post to another group
+        # can invalidate the old group's pages as well.
+        instance.loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and self.pk is not None
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.MANAGED_FIELDS]
+        super().save(*args, **kwargs)
+
+    @property
+    def thumbnail_url(self):
+        if not self.thumbnail:
+            return ''
+        return thumbnail_storage.url(self.thumbnail)
 
     def comment_count(self):
-        return Comment.objects.filter(post=self).count()
+        return self.comments_count
+
+
+# Every comment stores the ids of its ancestors and its own as fixed-width
+# base 36 segments, so sorting by path lists a thread depth first and a
+# subtree is the range [path, path + SUBTREE_END).
+PATH_SEGMENT = 8
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+SUBTREE_END = '~'
+COMMENT_MAX_DEPTH = 5
+
+
+def path_segment(pk):
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = PATH_DIGITS[digit] + digits
+    return digits.rjust(PATH_SEGMENT, '0')
+
+
+def path_ids(path):
+    return [int(path[start:start + PATH_SEGMENT], 36)
+            for start in range(0, len(path), PATH_SEGMENT)]
+
+
+class CommentManager(models.Manager):
+
+    def subtree(self, path):
+        """The comment with `path` and all its replies, in display order."""
+        return (self.filter(path__gte=path, path__lt=path + SUBTREE_END)
+                .order_by('path'))
+
+    def attach_threads(self, post_id, roots):
+        """Set `thread` on each root to its replies, in one query with a
+        path range per root."""
+        roots = list(roots)
+        for root in roots:
+            root.thread = []
+        if not roots:
+            return roots
+        by_segment = {root.path[:PATH_SEGMENT]: root for root in roots}
+        # Only the threads of these roots: comments between them in path
+        # order may belong to other chunks.
+        ranges = functools.reduce(operator.or_, (
+            models.Q(post_id=post_id, path__gt=segment,
+                     path__lt=segment + SUBTREE_END)
+            for segment in by_segment))
+        # Sorted here: each range comes out of the index in path order,
+        # but SQLite would sort their union in a temporary B-tree.
+        replies = sorted(self.filter(ranges).select_related('author')
+                         .order_by(), key=operator.attrgetter('path'))
+        for reply in replies:
+            by_segment[reply.path[:PATH_SEGMENT]].thread.append(reply)
+        return roots
+
+    def fill_paths(self, batch_size=1000):
+        """Give top-level comments written without a path (bulk_create)
+        their path."""
+        missing = (self.filter(path='', parent=None).order_by('pk')
+                   .values_list('pk', flat=True))
+        batch = []
+        for pk in missing.iterator(chunk_size=batch_size):
+            batch.append(self.model(pk=pk, path=path_segment(pk)))
+            if len(batch) >= batch_size:
+                self.bulk_update(batch, ['path'])
+                batch = []
+        if batch:
+            self.bulk_update(batch, ['path'])
 
 
 class Comment(models.Model):
@@ -39,9 +151,43 @@ class Comment(models.Model):
                                related_name='comment_author')
     text = models.TextField()
     created = models.DateTimeField('date published', auto_now_add=True)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True,
+                               blank=True, related_name='replies')
+    path = models.CharField(
+        max_length=PATH_SEGMENT * (COMMENT_MAX_DEPTH + 1), blank=True,
+        editable=False)
+
+    objects = CommentManager()
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_date_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='comment_post_path_idx'),
+        ]
+
+    @property
+    def depth(self):
+        return max(len(self.path) // PATH_SEGMENT - 1, 0)
+
+    def save(self, *args, **kwargs):
+        if self.path or self.pk is not None:
+            return super().save(*args, **kwargs)
+        prefix = ''
+        if self.parent_id is not None:
+            prefix = self.parent.path
+            if self.parent.depth >= COMMENT_MAX_DEPTH:
+                # Too deep: answer next to the parent instead of below it.
+                prefix = prefix[:PATH_SEGMENT * COMMENT_MAX_DEPTH]
+                self._meta.get_field('parent').delete_cached_value(self)
+                self.parent_id = path_ids(prefix)[-1]
+        # The path ends with the id, which is only known after the insert.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            self.path = prefix + path_segment(self.pk)
+            type(self).objects.filter(pk=self.pk).update(path=self.path)
 
 
 class Follow(models.Model):
@@ -55,3 +201,67 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['author', 'user'],
                                     name='unique_followers'),
         ]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
+
+
+class Reaction(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='reactions')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='reactions')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_reaction'),
+        ]
+
+
+class ReactionCounter(models.Model):
+    """One of several rows whose sum is the number of likes of a post.
+
+    Writers add to a random shard, so concurrent likes of a hot post do
+    not queue up on one row; `reactions.compact()` folds them back.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='reaction_counters')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'shard'],
+                                    name='unique_reaction_shard'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline', db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_date_post_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
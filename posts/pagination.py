@@ -0,0 +1,192 @@
+import datetime as dt
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+PER_PAGE = 10
+WINDOW = 2
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def encode_cursor(date, pk):
+    delta = date - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 10 ** 6
+    return f'{micros + delta.microseconds}_{pk}'
+
+
+def decode_cursor(token):
+    try:
+        micros, pk = token.split('_')
+        return EPOCH + dt.timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def older_than(queryset, field, cursor, tiebreak='pk'):
+    date, pk = cursor
+    # Written as a range on the date plus a tie-break so SQLite can walk
+    # the date index instead of expanding an OR into two scans.
+    return (queryset
+            .filter(Q(**{f'{field}__lte': date}),
+                    ~Q(**{field: date, f'{tiebreak}__gte': pk}))
+            .order_by(f'-{field}', f'-{tiebreak}'))
+
+
+def newer_than(queryset, field, cursor, tiebreak='pk'):
+    date, pk = cursor
+    return (queryset
+            .filter(Q(**{f'{field}__gte': date}),
+                    ~Q(**{field: date, f'{tiebreak}__lte': pk}))
+            .order_by(field, tiebreak))
+
+
+class CursorPage:
+    """Keyset page with a window of neighbouring page links."""
+
+    def __init__(self, request, object_list, number, behind, ahead, field,
+                 per_page, window, tiebreak='pk'):
+        self.object_list = object_list
+        self.number = number
+        self._request = request
+        self._field = field
+        self._tiebreak = tiebreak
+        rows = list(object_list)
+        self.pages = []
+        for offset in range(min(window, number - 1), 0, -1):
+            if len(behind) <= (offset - 1) * per_page:
+                continue
+            if number - offset == 1:
+                query = self._query(page=None)
+            else:
+                edge = rows[0] if offset == 1 else behind[
+                    (offset - 1) * per_page - 1]
+                query = self._query('after', edge, number - offset)
+            self.pages.append((number - offset, query, False))
+        self.pages.append((number, self._query(page=None), True))
+        for offset in range(1, window + 1):
+            if len(ahead) <= (offset - 1) * per_page:
+                break
+            edge = rows[-1] if offset == 1 else ahead[
+                (offset - 1) * per_page - 1]
+            self.pages.append((number + offset,
+                               self._query('before', edge, number + offset),
+                               False))
+        self.has_previous = number > 1 and bool(behind)
+        self.has_next = bool(ahead)
+        self.previous_query = self._page_query(number - 1)
+        self.next_query = self._page_query(number + 1)
+
+    def _query(self, direction=None, obj=None, page=None):
+        params = self._request.GET.copy()
+        for key in ('before', 'after', 'page'):
+            params.pop(key, None)
+        if direction is not None:
+            params[direction] = encode_cursor(*_key(obj, self._field,
+                                                    self._tiebreak))
+        if page is not None:
+            params['page'] = page
+        return '?' + params.urlencode()
+
+    def _page_query(self, number):
+        for page_number, query, _ in self.pages:
+            if page_number == number:
+                return query
+        return None
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(request, queryset, field='pub_date', per_page=PER_PAGE,
+             window=WINDOW, tiebreak='pk'):
+    """Return `page`, `paginator` and `cursor` for a keyset-paged feed.
+
+    `page` and `paginator` are plain Django objects over the current rows
+    only, so nothing issues COUNT or OFFSET queries. `paginator.count` is
+    the number of rows known up to the end of the link window, a lower
+    bound that keeps `num_pages` and `page.has_next()` in step with
+    `cursor`, which carries the navigation state for
+    `includes/paginator.html`. Rows are ordered by
+    `field` and then by the unique `tiebreak`, which should come from the
+    same index as `field`.
+    """
+    before = decode_cursor(request.GET.get('before'))
+    after = decode_cursor(request.GET.get('after'))
+    try:
+        number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        number = 1
+    ordered = queryset.order_by(f'-{field}', f'-{tiebreak}')
+    span = (window - 1) * per_page + 1
+    rows, behind, ahead = [], [], []
+
+    if after is not None:
+        newer = list(newer_than(queryset, field, after,
+                                tiebreak)[:per_page + span])
+        if len(newer) > per_page:
+            rows = newer[:per_page][::-1]
+            behind = newer[per_page:]
+            ahead = list(older_than(queryset, field,
+                                    _key(rows[-1], field, tiebreak),
+                                    tiebreak)[:span])
+        number = max(number, 2)
+    elif before is not None:
+        fetched = list(older_than(queryset, field, before,
+                                  tiebreak)[:per_page + span])
+        rows, ahead = fetched[:per_page], fetched[per_page:]
+    elif number > 1:
+        # Legacy `?page=N` links still work, at the cost of an OFFSET.
+        start = (number - 1) * per_page
+        fetched = list(ordered[start:start + per_page + span])
+        rows, ahead = fetched[:per_page], fetched[per_page:]
+
+    if rows and not behind and number > 1:
+        behind = list(newer_than(queryset, field,
+                                 _key(rows[0], field, tiebreak),
+                                 tiebreak)[:span])
+        if not behind:
+            # Nothing is newer, so this is the first page after all.
+            number = 1
+    if not rows:
+        number = 1
+        fetched = list(ordered[:per_page + span])
+        rows, behind, ahead = fetched[:per_page], [], fetched[per_page:]
+
+    cursor = CursorPage(request, rows, number, behind, ahead, field,
+                        per_page, window, tiebreak)
+    paginator = Paginator(rows, per_page)
+    paginator.count = (number - 1) * per_page + len(rows) + len(ahead)
+    page = Page(rows, number, paginator)
+    return {'page': page, 'paginator': paginator, 'cursor': cursor}
+
+
+def chunk(queryset, token=None, field='pub_date', per_page=PER_PAGE,
+          tiebreak='pk'):
+    """Return the newest `per_page` rows older than the `token` cursor
+    and the cursor of the next chunk, or None when this one is the last.
+
+    The rows are an evaluated queryset, so related objects picked with
+    select_related() come in the same query.
+    """
+    cursor = decode_cursor(token)
+    if cursor is None:
+        rows = queryset.order_by(f'-{field}', f'-{tiebreak}')
+    else:
+        rows = older_than(queryset, field, cursor, tiebreak)
+    rows = rows[:per_page]
+    if len(rows) < per_page:
+        return rows, None
+    last = _key(rows[per_page - 1], field, tiebreak)
+    if not older_than(queryset, field, last, tiebreak).exists():
+        return rows, None
+    return rows, encode_cursor(*last)
+
+
+def _key(obj, field, tiebreak='pk'):
+    return getattr(obj, field), getattr(obj, tiebreak)
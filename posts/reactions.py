@@ -0,0 +1,97 @@
+"""Likes, counted in sharded rows.
+
+A like inserts or deletes its `Reaction` and adds ±1 to a random
+`ReactionCounter` shard of the post in the same transaction. Pages read
+the sum of the shards as an annotation of the query that loads the
+posts, and `compact()` periodically folds the shards of each post into
+one row.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import (BooleanField, Count, Exists, F, OuterRef,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+
+from posts.cache import invalidate
+from posts.models import Reaction, ReactionCounter
+
+UPSERT_SQL = '''
+INSERT INTO {table} (post_id, shard, count) VALUES (%s, %s, %s)
+ON CONFLICT (post_id, shard) DO UPDATE SET count = count + excluded.count
+'''
+
+
+def _add(post_id, delta):
+    shard = random.randrange(settings.REACTION_SHARDS)
+    connection = connections[router.db_for_write(ReactionCounter)]
+    table = connection.ops.quote_name(ReactionCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL.format(table=table),
+                       [post_id, shard, delta])
+
+
+def toggle(user, post):
+    """Like the post, or take the like back; return whether it is liked."""
+    try:
+        with transaction.atomic():
+            deleted, _ = (Reaction.objects.filter(user=user, post=post)
+                          .delete())
+            liked = not deleted
+            if liked:
+                Reaction.objects.create(user=user, post=post)
+            _add(post.pk, 1 if liked else -1)
+    except IntegrityError:
+        # A parallel request of the same user liked it first.
+        return True
+    # Only the post's own page: list pages show counts up to
+    # FEED_PAGE_CACHE_TIMEOUT old (the follow page up to its 20 second
+    # fragment cache) instead of being dropped for everybody on every
+    # click.
+    invalidate(f'post:{post.pk}')
+    return liked
+
+
+def count(post_id):
+    return ReactionCounter.objects.filter(post_id=post_id).aggregate(
+        total=Coalesce(Sum('count'), 0))['total']
+
+
+def likes():
+    """The like count of the outer post, as a correlated subquery."""
+    totals = (ReactionCounter.objects.filter(post=OuterRef('pk'))
+              .order_by().values('post')
+              .annotate(total=Sum('count')).values('total'))
+    return Coalesce(Subquery(totals), 0)
+
+
+def with_reactions(queryset, user):
+    """Annotate posts with `likes` and, for `user`, `liked`."""
+    if user.is_authenticated:
+        liked = Exists(Reaction.objects.filter(post=OuterRef('pk'),
+                                               user=user))
+    else:
+        liked = Value(False, output_field=BooleanField())
+    return queryset.annotate(likes=likes(), liked=liked)
+
+
+def compact():
+    """Fold the shards of every post into its lowest shard row."""
+    post_ids = (ReactionCounter.objects.order_by().values('post')
+                .annotate(rows=Count('pk')).filter(rows__gt=1)
+                .values_list('post', flat=True))
+    compacted = 0
+    for post_id in list(post_ids):
+        with transaction.atomic():
+            rows = list(ReactionCounter.objects.select_for_update()
+                        .filter(post_id=post_id).order_by('shard'))
+            if len(rows) < 2:
+                continue
+            keep, rest = rows[0], rows[1:]
+            ReactionCounter.objects.filter(pk=keep.pk).update(
+                count=F('count') + sum(row.count for row in rest))
+            ReactionCounter.objects.filter(
+                pk__in=[row.pk for row in rest]).delete()
+        compacted += 1
+    return compacted
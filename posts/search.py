@@ -0,0 +1,139 @@
+"""Full-text search over posts and comments backed by SQLite FTS5.
+
+The FTS tables use the model tables as external content and are kept in
+sync by triggers, so bulk inserts and queryset updates are indexed too.
+Django re-creates a table when a migration adds a column on SQLite, which
+drops its triggers; `ensure_index` runs after every migrate and puts them
+back.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+from posts.models import Post
+
+TABLES = {
+    'posts_post_fts': 'posts_post',
+    'posts_comment_fts': 'posts_comment',
+}
+
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    text, content='{table}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2')
+"""
+
+TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {table}
+    BEGIN
+        INSERT INTO {fts}({fts}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+PER_PAGE = 10
+
+# Matches in comments rank a little below matches in the post itself.
+COMMENT_PENALTY = 1.0
+
+RESULTS_SQL = """
+SELECT post_id, MIN(score) AS score FROM (
+    SELECT rowid AS post_id, bm25(posts_post_fts) AS score
+    FROM posts_post_fts WHERE posts_post_fts MATCH %s
+    UNION ALL
+    SELECT c.post_id, bm25(posts_comment_fts) + {penalty} AS score
+    FROM posts_comment_fts
+    JOIN posts_comment c ON c.id = posts_comment_fts.rowid
+    WHERE posts_comment_fts MATCH %s AND c.post_id IS NOT NULL
+)
+GROUP BY post_id
+{having}
+ORDER BY score, post_id
+LIMIT %s
+"""
+
+POST_IDS_SQL = ('SELECT rowid FROM posts_post_fts '
+                'WHERE posts_post_fts MATCH %s')
+COMMENT_IDS_SQL = ('SELECT rowid FROM posts_comment_fts '
+                   'WHERE posts_comment_fts MATCH %s')
+
+
+def available(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'sqlite'
+
+
+def ensure_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    if not available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {name for name, in cursor.fetchall()}
+        for fts, table in TABLES.items():
+            if f'{fts}_ai' in existing:
+                continue
+            cursor.execute(CREATE_TABLE.format(fts=fts, table=table))
+            for trigger in TRIGGERS:
+                cursor.execute(trigger.format(fts=fts, table=table))
+            # Rows written while the triggers were missing are not indexed.
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def drop_index(using=DEFAULT_DB_ALIAS):
+    if not available(using):
+        return
+    with connections[using].cursor() as cursor:
+        for fts in TABLES:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def to_match(query):
+    """Turn user input into a safe FTS5 query: every word, as a prefix."""
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def encode_cursor(score, post_id):
+    return f'{score!r}_{post_id}'
+
+
+def decode_cursor(token):
+    try:
+        score, post_id = token.split('_')
+        return float(score), int(post_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def search(query, after=None, limit=PER_PAGE):
+    """Return [(post_id, score), ...] ordered by relevance."""
+    match = to_match(query)
+    # The same database the posts of the results are then loaded from.
+    using = router.db_for_read(Post)
+    if not match or not available(using):
+        return []
+    params = [match, match]
+    having = ''
+    if after is not None:
+        having = 'HAVING score > %s OR (score = %s AND post_id > %s)'
+        params += [after[0], after[0], after[1]]
+    sql = RESULTS_SQL.format(penalty=COMMENT_PENALTY, having=having)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
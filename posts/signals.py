@@ -0,0 +1,100 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from posts import counters, timeline
+from posts.cache import SITE_TAG, invalidate, post_tags
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    elif update_fields is None or 'username' in update_fields:
+        counters.bump_versions(author=instance)
+        invalidate(SITE_TAG)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    tags = post_tags(instance)
+    if created:
+        timeline.schedule_fan_out(instance)
+        counters.bump_stats(instance.author_id, posts=1)
+    else:
+        counters.bump_versions(pk=instance.pk)
+        old_group_id = getattr(instance, 'loaded_group_id', None)
+        if old_group_id not in (None, instance.group_id):
+            old_group = Group.objects.filter(pk=old_group_id).first()
+            if old_group is not None:
+                tags.append(f'group:{old_group.slug}')
+    invalidate(*tags)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_stats(instance.author_id, posts=-1)
+    invalidate(*post_tags(instance))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        counters.bump_versions(group=instance)
+        invalidate(SITE_TAG)
+    invalidate(f'group:{instance.slug}')
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    counters.bump_versions(group=instance)
+    invalidate(SITE_TAG, f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+        counters.bump_stats(instance.author_id, followers=1)
+        counters.bump_stats(instance.user_id, following=1)
+        invalidate(*follow_tags(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    counters.bump_stats(instance.author_id, followers=-1)
+    counters.bump_stats(instance.user_id, following=-1)
+    invalidate(*follow_tags(instance))
+
+
+def follow_tags(follow):
+    return [f'author:{follow.author.username}',
+            f'author:{follow.user.username}']
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    if instance.post_id is not None:
+        counters.comment_added(instance.post_id)
+        invalidate(*post_tags(instance.post))
+    counters.bump_stats(instance.author_id, comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        counters.comment_removed(instance.post_id)
+        comment_post = Post.objects.filter(pk=instance.post_id).first()
+        if comment_post is not None:
+            invalidate(*post_tags(comment_post))
+    counters.bump_stats(instance.author_id, comments=-1)
@@ -0,0 +1,31 @@
+"""Slow jobs that can be moved off the request path with `enqueue()`."""
+from posts import counters, reactions, thumbnails, timeline
+from posts.models import Post
+
+
+def generate_thumbnails(post_id):
+    thumbnails.generate(post_id)
+
+
+def recount_comments():
+    counters.recount_comments()
+
+
+def recount_author_stats():
+    counters.recount_author_stats()
+
+
+def fan_out(post_id):
+    post = (Post.objects.filter(pk=post_id)
+            .only('pk', 'pub_date', 'author_id').first())
+    # A post deleted before the task ran has nothing to fan out.
+    if post is not None:
+        timeline.fan_out(post)
+
+
+def rebuild_timelines(user_ids=None):
+    timeline.rebuild(user_ids)
+
+
+def compact_reactions():
+    reactions.compact()
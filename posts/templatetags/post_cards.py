@@ -0,0 +1,35 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from monitoring.metrics import CACHE_REQUESTS
+from posts import thumbnails
+from yatube.reverse import cached_reverse
+
+register = template.Library()
+
+
+def card_key(post):
+    return f'post_card:{post.pk}:{post.version}'
+
+
+@register.simple_tag
+def post_card(post):
+    """Render the shared part of a post card, cached per post version."""
+    key = card_key(post)
+    html = cache.get(key)
+    CACHE_REQUESTS.inc(cache='fragment',
+                       result='miss' if html is None else 'hit')
+    if html is None:
+        thumbnails.ensure(post)
+        html = render_to_string('includes/post_card.html', {'post': post})
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+@register.simple_tag
+def cached_url(name, *args):
+    """`{% url %}` for the hot URL names, without resolving them again."""
+    return cached_reverse(name, *args)
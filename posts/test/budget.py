@@ -0,0 +1,23 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from yatube.query_budget import budget_of
+
+
+class QueryBudgetMixin:
+    """TestCase mixin that requests a URL and checks the view's budget."""
+
+    def assertWithinBudget(self, client, path, method='get', **kwargs):
+        budget = budget_of(resolve(path.split('?')[0]).func)
+        self.assertIsNotNone(budget, f'{path}: view declares no budget')
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(path, **kwargs)
+        executed = len(queries)
+        if executed > budget:
+            listing = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(queries.captured_queries, 1))
+            self.fail(f'{path}: {executed} queries, budget {budget}\n'
+                      f'{listing}')
+        return response
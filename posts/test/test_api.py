@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.test.budget import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='apiauthor')
+        cls.reader = User.objects.create_user(username='apireader')
+        cls.group = Group.objects.create(title='API', slug='api',
+                                         description='-')
+        cls.posts = [Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                         group=cls.group)
+                     for i in range(5)]
+        for i in range(3):
+            Comment.objects.create(post=cls.posts[-1], author=cls.reader,
+                                   text=f'Ответ {i}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_page_with_cursor(self):
+        for path, client in (
+                (reverse('api:posts'), self.client),
+                (reverse('api:group_posts', args=['api']), self.client),
+                (reverse('api:profile_posts', args=['apiauthor']),
+                 self.client),
+                (reverse('api:follow_posts'), self.reader_client)):
+            with self.subTest(path=path):
+                first = client.get(path, {'limit': 3}).json()
+                self.assertEqual([post['text'] for post in first['results']],
+                                 ['Пост 4', 'Пост 3', 'Пост 2'])
+                rest = client.get(path, {'limit': 3,
+                                         'before': first['next']}).json()
+                self.assertEqual([post['text'] for post in rest['results']],
+                                 ['Пост 1', 'Пост 0'])
+                self.assertIsNone(rest['next'])
+
+    def test_sparse_fields(self):
+        data = self.client.get(reverse('api:posts'),
+                               {'fields': 'id,author'}).json()
+        self.assertEqual(data['results'][0],
+                         {'id': self.posts[-1].pk, 'author': 'apiauthor'})
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        post = self.posts[-1]
+        path = reverse('api:post_detail', args=[post.pk])
+        data = self.client.get(path, {'limit': 2}).json()
+        self.assertEqual(data['group'], 'api')
+        self.assertEqual([c['text'] for c in data['comments']],
+                         ['Ответ 0', 'Ответ 1'])
+        rest = self.client.get(path, {'after': data['comments_next']}).json()
+        self.assertEqual([c['text'] for c in rest['comments']], ['Ответ 2'])
+
+    def test_errors_are_json(self):
+        for path, status in (
+                (reverse('api:group_posts', args=['missing']), 404),
+                (reverse('api:post_detail', args=[0]), 404),
+                (reverse('api:follow_posts'), 401),
+                (reverse('api:posts') + '?before=junk', 400)):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', response.json())
+
+    def test_query_budgets(self):
+        self.assertWithinBudget(self.client, reverse('api:posts'))
+        self.assertWithinBudget(self.reader_client, reverse('api:posts'))
+        self.assertWithinBudget(self.reader_client,
+                                reverse('api:follow_posts'))
+        self.assertWithinBudget(
+            self.reader_client,
+            reverse('api:post_detail', args=[self.posts[-1].pk]))
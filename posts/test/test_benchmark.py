@@ -0,0 +1,64 @@
+import io
+import json
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.management.commands.bench_views import next_page, percentile_ms
+from posts.models import Comment, Follow, Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BenchmarkCommandTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_percentiles_of_no_requests(self):
+        self.assertEqual(percentile_ms([], 0.95), 'n/a')
+        self.assertEqual(percentile_ms([0.001, 0.002, 0.003], 0.5), 2.0)
+
+    def test_seed_and_bench(self):
+        call_command('seed_benchmark', users=20, groups=2, posts=50,
+                     comments=40, follows=3, stdout=io.StringIO())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertFalse(Follow.objects.filter(
+            user=F('author')).exists())
+        self.assertFalse(Comment.objects.filter(
+            created__lt=F('post__pub_date')).exists())
+        # Comment dates are spread, so their order differs from id order.
+        newest_first = Comment.objects.order_by('-created', '-id')
+        self.assertNotEqual(list(newest_first.values_list('pk', flat=True)),
+                            list(Comment.objects.order_by('-id')
+                                 .values_list('pk', flat=True)))
+
+        response = self.client.get(reverse('index'))
+        following = next_page(reverse('index'), response.content.decode())
+        self.assertIn('before=', following)
+
+        out = io.StringIO()
+        call_command('bench_views', requests=5, concurrency=1, stdout=out)
+        report = {row['view']: row for row in json.loads(out.getvalue())}
+        self.assertEqual(set(report), {'index', 'group_posts', 'profile',
+                                       'post_view', 'follow_index'})
+        for row in report.values():
+            self.assertEqual(row['errors'], 0)
+            self.assertEqual(row['requests'], 5)
+            self.assertIsNotNone(row['queries_per_request'])
+
+        out = io.StringIO()
+        call_command('bench_render', posts=10, repeat=3, cold=True,
+                     stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['posts'], 10)
+        self.assertGreater(report['per_post_us'], 0)
@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.templatetags.post_cards import card_key
+from yatube.sqlite_cache import SQLiteCache
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cardholder')
+        cls.group = Group.objects.create(slug='cards', title='Карты',
+                                         description='Карты')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(text='Карточка', author=self.user,
+                                        group=self.group)
+
+    def current(self):
+        return Post.objects.get(pk=self.post.pk)
+
+    def test_card_is_cached_by_version(self):
+        self.client.get(reverse('profile', args=[self.user]))
+        self.assertIn('Карточка', cache.get(card_key(self.current())))
+
+    def test_edit_comment_and_group_change_bump_version(self):
+        version = self.current().version
+        post = self.current()
+        post.text = 'Правка'
+        post.save()
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        self.group.title = 'Новое имя'
+        self.group.save()
+        self.assertEqual(self.current().version, version + 3)
+
+    def test_edit_link_is_not_cached(self):
+        author_client = Client()
+        author_client.force_login(self.user)
+        edit_url = reverse('post_edit', args=[self.user, self.post.pk])
+        self.assertContains(
+            author_client.get(reverse('profile', args=[self.user])),
+            edit_url)
+        self.assertNotContains(
+            self.client.get(reverse('profile', args=[self.user])), edit_url)
+
+
+class TaggedPageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pagewriter')
+        cls.group = Group.objects.create(slug='pages', title='Страницы',
+                                         description='Страницы')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.guest_client = Client()
+
+    def test_untouched_pages_stay_cached(self):
+        post = Post.objects.create(text='Было', author=self.user)
+        group_url = reverse('group_posts', args=[self.group.slug])
+        self.guest_client.get(reverse('index'))
+        self.guest_client.get(group_url)
+        Post.objects.filter(pk=post.pk).update(text='Стало')
+        Post.objects.create(text='В группе', author=self.user,
+                            group=self.group)
+        self.assertContains(self.guest_client.get(group_url), 'В группе')
+        response = self.guest_client.get(reverse('index'))
+        self.assertNotContains(response, 'Стало')
+        self.assertContains(response, 'В группе')
+
+    def test_moving_post_invalidates_old_group(self):
+        post = Post.objects.create(text='Переезд', author=self.user,
+                                   group=self.group)
+        group_url = reverse('group_posts', args=[self.group.slug])
+        self.assertContains(self.guest_client.get(group_url), 'Переезд')
+        other = Group.objects.create(slug='other', title='Другая',
+                                     description='Другая')
+        self.author_client.post(
+            reverse('post_edit', args=[self.user, post.pk]),
+            {'text': 'Переезд', 'group': other.pk})
+        self.assertNotContains(self.guest_client.get(group_url), 'Переезд')
+
+    def test_writer_bypasses_cache_after_posting(self):
+        self.author_client.get(reverse('index'))
+        Post.objects.filter(author=self.user).delete()
+        self.author_client.post(reverse('new_post'), {'text': 'Свежее'})
+        self.assertTrue(
+            self.author_client.session['page_cache_bypass_until'])
+        self.assertContains(self.author_client.get(reverse('index')),
+                            'Свежее')
+
+    def test_unchanged_page_is_not_modified(self):
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   group=self.group)
+        url = reverse('post_view', args=[self.user, post.pk])
+        first = self.guest_client.get(url)
+        self.assertTrue(first.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_etag(self):
+        post = Post.objects.create(text='Пост', author=self.user)
+        url = reverse('post_view', args=[self.user, post.pk])
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=post, author=self.user, text='Новый')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Новый')
+
+
+def incr_many(location, times):
+    backend = SQLiteCache(location, {})
+    for _ in range(times):
+        backend.incr('counter')
+
+
+class SQLiteCacheTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.tmp.name, 'cache.sqlite3')
+        self.backend = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_basic_operations(self):
+        self.backend.set('key', {'value': 1})
+        self.assertEqual(self.backend.get('key'), {'value': 1})
+        self.assertFalse(self.backend.add('key', 'other'))
+        self.assertTrue(self.backend.add('new', 'value'))
+        self.assertEqual(self.backend.get_many(['key', 'new', 'none']),
+                         {'key': {'value': 1}, 'new': 'value'})
+        self.backend.delete('key')
+        self.assertIsNone(self.backend.get('key'))
+        with self.assertRaises(ValueError):
+            self.backend.incr('missing')
+
+    def test_expired_entries_are_misses(self):
+        self.backend.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.backend.get('key'))
+        self.assertTrue(self.backend.add('key', 'fresh'))
+
+    def test_entries_are_shared_between_processes(self):
+        self.backend.set('counter', 0)
+        processes = [multiprocessing.Process(target=incr_many,
+                                             args=(self.location, 50))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.backend.get('counter'), 200)
+
+    def test_cull_evicts_least_recently_used(self):
+        backend = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+        for i in range(12):
+            backend.set(f'key{i}', i)
+            backend._connection().execute(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                (i, backend.make_key(f'key{i}')))
+        backend.cull()
+        self.assertIsNone(backend.get('key0'))
+        self.assertEqual(backend.get('key11'), 11)
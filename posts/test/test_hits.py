@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import hits
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(VIEW_BUFFER_ENABLED=True, VIEW_FLUSH_EVENTS=5,
+                   VIEW_FLUSH_SECONDS=3600)
+class PostViewCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewed')
+        cls.posts = [Post.objects.create(text=f'Пост {i}', author=cls.user)
+                     for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        hits._wake.clear()
+
+    def views(self):
+        return [post.views for post in
+                Post.objects.order_by('pk').only('views')]
+
+    def test_threshold_wakes_the_flusher_instead_of_writing(self):
+        path = reverse('post_view', args=[self.user, self.posts[0].pk])
+        for _ in range(4):
+            self.client.get(path)
+        self.assertFalse(hits._wake.is_set())
+        # The fifth view is served from the page cache and still counts,
+        # but the request does not write it.
+        with self.assertNumQueries(0):
+            self.client.get(path)
+        self.assertTrue(hits._wake.is_set())
+        self.assertEqual(self.views(), [0, 0, 0])
+        hits.flush()
+        self.assertEqual(self.views(), [5, 0, 0])
+
+    def test_flush_refreshes_the_cached_page(self):
+        path = reverse('post_view', args=[self.user, self.posts[0].pk])
+        self.client.get(path)
+        etag = self.client.get(path)['ETag']
+        # A browser revalidating its copy is a view as well.
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        hits.flush()
+        self.assertContains(self.client.get(path), 'Просмотров: 3')
+
+    def test_views_of_another_database_are_dropped(self):
+        database = connection.settings_dict['NAME']
+        connection.settings_dict['NAME'] = 'finished_test_run'
+        try:
+            hits.record(self.posts[0].pk)
+        finally:
+            connection.settings_dict['NAME'] = database
+        with self.assertNumQueries(0):
+            self.assertEqual(hits.flush(), 0)
+        self.assertEqual(self.views(), [0, 0, 0])
+
+    @override_settings(VIEW_BUFFER_ENABLED=False)
+    def test_buffer_can_be_disabled(self):
+        hits.record(self.posts[0].pk)
+        self.assertEqual(hits.flush(), 0)
+
+    def test_flush_is_one_update_for_all_posts(self):
+        for post, count in zip(self.posts, (3, 1, 0)):
+            for _ in range(count):
+                hits.record(post.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(hits.flush(), 2)
+        self.assertEqual(self.views(), [3, 1, 0])
+
+    def test_popular_posts_use_the_index(self):
+        hits.record(self.posts[1].pk)
+        hits.flush()
+        data = self.client.get(reverse('api:popular_posts'),
+                               {'fields': 'id,views', 'limit': 2}).json()
+        self.assertEqual(data['results'][0],
+                         {'id': self.posts[1].pk, 'views': 1})
+        query = str(Post.objects.order_by('-views', '-id')[:2].query)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + query)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('post_views_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
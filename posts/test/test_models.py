@@ -0,0 +1,95 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CommentCounterTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+
+    def setUp(self):
+        self.post = Post.objects.create(text='Пост', author=self.user)
+
+    def add_comment(self, text='Комментарий'):
+        return Comment.objects.create(post=self.post, author=self.user,
+                                      text=text)
+
+    def test_counter_follows_create_and_delete(self):
+        first = self.add_comment()
+        self.add_comment()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        first.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_bulk_delete_updates_counter(self):
+        self.add_comment()
+        self.add_comment()
+        Comment.objects.filter(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_saving_stale_post_keeps_counter(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        self.add_comment()
+        stale.text = 'Новый текст'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Новый текст')
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_recount_repairs_drift(self):
+        self.add_comment()
+        Post.objects.update(comments_count=42)
+        call_command('recount_comments', stdout=io.StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class AuthorStatsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='star')
+        cls.reader = User.objects.create_user(username='fan')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_stats_follow_content(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ура')
+        author_stats = self.stats(self.author)
+        self.assertEqual((author_stats.followers, author_stats.posts),
+                         (1, 1))
+        reader_stats = self.stats(self.reader)
+        self.assertEqual((reader_stats.following, reader_stats.comments),
+                         (1, 1))
+        follow.delete()
+        post.delete()
+        author_stats = self.stats(self.author)
+        self.assertEqual((author_stats.followers, author_stats.posts),
+                         (0, 0))
+        self.assertEqual(self.stats(self.reader).comments, 0)
+
+    def test_recount_restores_missing_rows(self):
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.all().delete()
+        call_command('recount_author_stats', stdout=io.StringIO())
+        author_stats = self.stats(self.author)
+        self.assertEqual((author_stats.followers, author_stats.posts),
+                         (1, 1))
+        self.assertEqual(self.stats(self.reader).following, 1)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.pagination import decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.posts = [Post.objects.create(text=f'Пост номер {i}',
+                                         author=cls.user)
+                     for i in range(35)]
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, query='?'):
+        seen = []
+        while query is not None:
+            response = self.client.get(url + query)
+            page = response.context['page']
+            self.assertEqual(page.has_next(),
+                             response.context['cursor'].has_next)
+            self.assertEqual(page.has_previous(),
+                             response.context['cursor'].has_previous)
+            self.assertLessEqual(page.number, page.paginator.num_pages)
+            seen.append([post.pk for post in page])
+            query = (response.context['cursor'].next_query
+                     if response.context['cursor'].has_next else None)
+        return seen
+
+    def test_cursor_round_trip(self):
+        post = self.posts[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post.pub_date, post.pk)),
+            (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('garbage'))
+
+    def test_forward_walk_visits_every_post_once(self):
+        pages = self.walk(reverse('profile', args=[self.user]))
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 5])
+        visited = [pk for page in pages for pk in page]
+        expected = [post.pk for post in reversed(self.posts)]
+        self.assertEqual(visited, expected)
+
+    def test_previous_link_returns_to_same_page(self):
+        url = reverse('profile', args=[self.user])
+        first = self.client.get(url)
+        second = self.client.get(url + first.context['cursor'].next_query)
+        third = self.client.get(url + second.context['cursor'].next_query)
+        self.assertEqual(third.context['cursor'].number, 3)
+        back = self.client.get(url + third.context['cursor'].previous_query)
+        self.assertEqual(list(back.context['page']),
+                         list(second.context['page']))
+        self.assertEqual(back.context['cursor'].number, 2)
+
+    def test_window_is_limited(self):
+        response = self.client.get(reverse('profile', args=[self.user]))
+        numbers = [number for number, _, _ in
+                   response.context['cursor'].pages]
+        self.assertEqual(numbers, [1, 2, 3])
+
+    def test_no_count_or_offset_queries(self):
+        first = self.client.get(reverse('index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('index') +
+                            first.context['cursor'].next_query)
+        for query in queries:
+            self.assertNotIn('OFFSET', query['sql'])
+            self.assertNotIn('COUNT(*) AS "__count" FROM "posts_post"',
+                             query['sql'])
+
+    def test_legacy_page_number(self):
+        response = self.client.get(
+            reverse('profile', args=[self.user]) + '?page=2')
+        self.assertEqual(response.context['cursor'].number, 2)
+        self.assertEqual(response.context['page'][0].pk, self.posts[24].pk)
+
+    def test_paginator_agrees_with_cursor(self):
+        url = reverse('profile', args=[self.user])
+        first = self.client.get(url)
+        self.assertEqual(first.context['paginator'].num_pages, 3)
+        last = self.client.get(url + '?page=4')
+        self.assertEqual(last.context['page'].number, 4)
+        self.assertEqual(last.context['paginator'].num_pages, 4)
+        self.assertEqual(last.context['paginator'].count, 35)
+        self.assertFalse(last.context['page'].has_next())
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import URLPattern, reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.test.budget import QueryBudgetMixin
+from posts.urls import urlpatterns as posts_urls
+from users.urls import urlpatterns as users_urls
+from yatube.query_budget import budget_of
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Pages of 10 posts with groups and comments, rendered cold."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        cls.reader = User.objects.create_user(username='reader')
+        cls.groups = [Group.objects.create(title=f'Группа {i}',
+                                           slug=f'group-{i}',
+                                           description='-')
+                      for i in range(2)]
+        for i in range(12):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=cls.authors[i % 3],
+                group=cls.groups[i % 2])
+            for author in cls.authors:
+                Comment.objects.create(post=post, author=author,
+                                       text='Комментарий')
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.post.author)
+
+    def test_every_view_declares_a_budget(self):
+        for pattern in [*posts_urls, *users_urls]:
+            if isinstance(pattern, URLPattern):
+                with self.subTest(pattern=pattern.name):
+                    self.assertIsNotNone(budget_of(pattern.callback))
+
+    def test_list_pages(self):
+        author = self.post.author.username
+        for path in (reverse('index'),
+                     reverse('index') + '?page=2',
+                     reverse('group_posts', args=[self.groups[0].slug]),
+                     reverse('profile', args=[author]),
+                     reverse('search') + '?q=пост'):
+            for client in (self.client, self.reader_client):
+                with self.subTest(path=path):
+                    cache.clear()
+                    self.assertWithinBudget(client, path)
+        self.assertWithinBudget(self.reader_client, reverse('follow_index'))
+
+    def test_post_pages(self):
+        args = [self.post.author.username, self.post.pk]
+        self.assertWithinBudget(self.client, reverse('post_view', args=args))
+        self.assertWithinBudget(self.reader_client,
+                                reverse('add_comment', args=args))
+        self.assertWithinBudget(self.reader_client,
+                                reverse('add_comment', args=args),
+                                method='post', data={'text': 'Ещё'})
+        self.assertWithinBudget(self.author_client,
+                                reverse('post_edit', args=args))
+        self.assertWithinBudget(self.author_client,
+                                reverse('post_edit', args=args),
+                                method='post', data={'text': 'Правка'})
+
+    def test_forms_and_follow(self):
+        author = self.authors[0].username
+        self.assertWithinBudget(self.reader_client, reverse('new_post'))
+        self.assertWithinBudget(self.reader_client, reverse('new_post'),
+                                method='post', data={'text': 'Новый'})
+        self.assertWithinBudget(self.reader_client,
+                                reverse('profile_unfollow', args=[author]))
+        self.assertWithinBudget(self.reader_client,
+                                reverse('profile_follow', args=[author]))
+        self.assertWithinBudget(self.client, reverse('signup'))
+        self.assertWithinBudget(
+            self.client, reverse('signup'), method='post',
+            data={'first_name': 'Новый', 'last_name': 'Автор',
+                  'username': 'newcomer', 'email': 'new@example.com',
+                  'password1': 'Sup3r-secret', 'password2': 'Sup3r-secret'})
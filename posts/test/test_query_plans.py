@@ -0,0 +1,40 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='planner')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Планы', slug='plans',
+                                     description='-')
+        for i in range(25):
+            post = Post.objects.create(text=f'Пост {i}', author=author,
+                                       group=group)
+            Comment.objects.create(post=post, author=reader, text='+')
+        Follow.objects.create(user=reader, author=author)
+
+    def test_list_and_detail_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('Все планы используют индексы', out.getvalue())
+
+    def test_foreign_keys_have_no_separate_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table)
+        indexes = [info['columns'] for info in constraints.values()
+                   if info['index']]
+        self.assertNotIn(['author_id'], indexes)
+        self.assertNotIn(['group_id'], indexes)
+        self.assertIn(['author_id', 'pub_date', 'id'], indexes)
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import reactions
+from posts.models import Post, Reaction, ReactionCounter
+from posts.test.budget import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class ReactionTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='liked')
+        cls.fans = [User.objects.create_user(username=f'fan{i}')
+                    for i in range(12)]
+        cls.post = Post.objects.create(text='Нравится', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_toggle_likes_and_unlikes(self):
+        for fan in self.fans:
+            self.assertTrue(reactions.toggle(fan, self.post))
+        self.assertFalse(reactions.toggle(self.fans[0], self.post))
+        self.assertEqual(Reaction.objects.count(), len(self.fans) - 1)
+        self.assertEqual(reactions.count(self.post.pk), len(self.fans) - 1)
+
+    def test_compact_keeps_the_sum(self):
+        for fan in self.fans:
+            reactions.toggle(fan, self.post)
+        self.assertGreater(ReactionCounter.objects.count(), 1)
+        self.assertEqual(reactions.compact(), 1)
+        [row] = ReactionCounter.objects.all()
+        self.assertEqual(row.count, len(self.fans))
+
+    def test_feed_shows_likes_without_extra_queries(self):
+        path = reverse('index')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(path)
+        for fan in self.fans[:3]:
+            reactions.toggle(fan, self.post)
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(path)
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(response.context['page'][0].likes, 3)
+
+    def test_like_keeps_feeds_cached(self):
+        index = reverse('index')
+        post_page = reverse('post_view', args=[self.author, self.post.pk])
+        self.client.get(index)
+        self.client.get(post_page)
+        reactions.toggle(self.fans[0], self.post)
+        with self.assertNumQueries(0):
+            self.client.get(index)
+        response = self.client.get(post_page)
+        self.assertEqual(response.context['post'].likes, 1)
+
+    def test_like_endpoint(self):
+        client = Client()
+        client.force_login(self.fans[0])
+        path = reverse('post_like', args=[self.author, self.post.pk])
+        self.assertWithinBudget(client, path, method='post')
+        response = client.post(path, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'liked': False, 'likes': 0})
+        response = client.get(reverse('post_view',
+                                      args=[self.author, self.post.pk]))
+        self.assertFalse(response.context['post'].liked)
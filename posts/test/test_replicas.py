@@ -0,0 +1,66 @@
+import datetime as dt
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+from yatube import replicas
+from yatube.models import Heartbeat
+from yatube.query_budget import QueryCounter
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        replicas._lags.clear()
+        Heartbeat.objects.create(pk=1, beat=timezone.now())
+        self.user = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(text='Текст', author=self.user)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get(self, path):
+        # The replica lag check is not part of the page.
+        counter = QueryCounter(skip=[Heartbeat._meta.db_table])
+        with connections['replica1'].execute_wrapper(counter):
+            response = self.client.get(path)
+        return response, counter.count
+
+    def test_read_only_page_reads_from_replica(self):
+        response, replica_queries = self.get(reverse('index'))
+        self.assertEqual(response.wsgi_request.db_replica, 'replica1')
+        self.assertGreater(replica_queries, 0)
+
+    def test_forms_read_from_primary(self):
+        response, replica_queries = self.get(reverse('new_post'))
+        self.assertFalse(hasattr(response.wsgi_request, 'db_replica'))
+        self.assertEqual(replica_queries, 0)
+
+    def test_session_sticks_to_primary_after_write(self):
+        self.client.post(reverse('new_post'), {'text': 'Новый пост'})
+        response, replica_queries = self.get(reverse('index'))
+        self.assertFalse(hasattr(response.wsgi_request, 'db_replica'))
+        self.assertEqual(replica_queries, 0)
+        self.assertContains(response, 'Новый пост')
+
+    def test_lagging_replica_is_skipped(self):
+        Heartbeat.objects.filter(pk=1).update(
+            beat=timezone.now() - dt.timedelta(minutes=5))
+        response, replica_queries = self.get(reverse('index'))
+        self.assertIsNone(response.wsgi_request.db_replica)
+        self.assertEqual(replica_queries, 0)
+
+    def test_writes_outside_requests_are_not_remembered(self):
+        # setUp wrote through the router with no request in progress.
+        self.assertFalse(getattr(replicas._state, 'wrote', False))
+        response, replica_queries = self.get(reverse('index'))
+        self.assertEqual(response.wsgi_request.db_replica, 'replica1')
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post
+from users.forms import CreationForm
+
+User = get_user_model()
+
+
+class FullTextSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.client = Client()
+
+    def test_new_and_edited_posts_are_indexed(self):
+        post = Post.objects.create(text='Про котов', author=self.user)
+        self.assertEqual([pk for pk, _ in search.search('кот')], [post.pk])
+        Post.objects.filter(pk=post.pk).update(text='Про собак')
+        self.assertEqual(search.search('кот'), [])
+        self.assertEqual([pk for pk, _ in search.search('собак')],
+                         [post.pk])
+        post.delete()
+        self.assertEqual(search.search('собак'), [])
+
+    def test_comment_match_finds_its_post(self):
+        post = Post.objects.create(text='Просто пост', author=self.user)
+        Comment.objects.create(post=post, author=self.user,
+                               text='Отличный рецепт борща')
+        self.assertEqual([pk for pk, _ in search.search('борщ')], [post.pk])
+
+    def test_post_match_ranks_above_comment_match(self):
+        commented = Post.objects.create(text='Пост', author=self.user)
+        Comment.objects.create(post=commented, author=self.user,
+                               text='Пельмени')
+        post = Post.objects.create(text='Пельмени', author=self.user)
+        self.assertEqual([pk for pk, _ in search.search('пельмени')],
+                         [post.pk, commented.pk])
+
+    def test_user_input_is_not_fts_syntax(self):
+        Post.objects.create(text='Скобки', author=self.user)
+        self.assertEqual(search.search('"скобки" OR ('), [])
+        self.assertEqual(search.search('***'), [])
+
+    def test_search_does_not_shadow_a_profile(self):
+        User.objects.create_user(username='search')
+        self.assertEqual(self.client.get('/search/').status_code, 200)
+        self.assertEqual(reverse('search'), '/-/search/')
+        self.assertIn('username', CreationForm({'username': '-'}).errors)
+
+    def test_search_page_keyset(self):
+        posts = [Post.objects.create(text=f'Сыр номер {i}', author=self.user)
+                 for i in range(search.PER_PAGE + 3)]
+        response = self.client.get(reverse('search'), {'q': 'сыр'})
+        first = response.context['page']
+        self.assertEqual(len(first), search.PER_PAGE)
+        self.assertIsNotNone(response.context['next_query'])
+        response = self.client.get(
+            reverse('search') + response.context['next_query'])
+        rest = response.context['page']
+        self.assertEqual(len(rest), 3)
+        self.assertIsNone(response.context['next_query'])
+        self.assertCountEqual([p.pk for p in first + rest],
+                              [p.pk for p in posts])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        post = Post.objects.create(text='Редкое слово', author=self.user)
+        Post.objects.create(text='Другое', author=self.user)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'редк'})
+        self.assertEqual(
+            [p.pk for p in response.context['cl'].result_list], [post.pk])
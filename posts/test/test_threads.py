@@ -0,0 +1,101 @@
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import COMMENT_MAX_DEPTH, Comment, Post
+from posts.transfer import export_records, import_records
+
+User = get_user_model()
+
+
+class CommentThreadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='threader')
+        cls.post = Post.objects.create(text='Ветка', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def reply(self, parent=None, text='+'):
+        return Comment.objects.create(post=self.post, author=self.user,
+                                      parent=parent, text=text)
+
+    def test_subtree_is_one_query_in_display_order(self):
+        root = self.reply(text='корень')
+        first = self.reply(root, 'первый')
+        self.reply(first, 'ответ на первый')
+        self.reply(root, 'второй')
+        self.reply(text='другой корень')
+        with self.assertNumQueries(1):
+            texts = [c.text for c in Comment.objects.subtree(root.path)]
+        self.assertEqual(texts, ['корень', 'первый', 'ответ на первый',
+                                 'второй'])
+
+    def test_threads_of_roots_outside_the_chunk_are_not_loaded(self):
+        first, middle, last = [self.reply(text=f'корень {n}')
+                               for n in range(3)]
+        self.reply(first, 'ответ первому')
+        for _ in range(5):
+            self.reply(middle, 'ответ из другой порции')
+        self.reply(last, 'ответ последнему')
+        with CaptureQueriesContext(connection) as queries:
+            roots = Comment.objects.attach_threads(self.post.pk,
+                                                   [first, last])
+        self.assertEqual([[c.text for c in root.thread] for root in roots],
+                         [['ответ первому'], ['ответ последнему']])
+        [query] = queries.captured_queries
+        with connection.cursor() as cursor:
+            cursor.execute(query['sql'])
+            self.assertEqual(len(cursor.fetchall()), 2)
+
+    def test_replies_below_max_depth_become_siblings(self):
+        comment = self.reply()
+        for _ in range(COMMENT_MAX_DEPTH):
+            comment = self.reply(comment)
+        self.assertEqual(comment.depth, COMMENT_MAX_DEPTH)
+        too_deep = self.reply(comment)
+        self.assertEqual(too_deep.depth, COMMENT_MAX_DEPTH)
+        self.assertEqual(too_deep.parent_id, comment.parent_id)
+
+    def test_post_page_shows_threads(self):
+        root = self.reply(text='вопрос')
+        self.reply(root, 'ответ')
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('add_comment', args=[self.user, self.post.pk])
+                    + f'?reply_to={root.pk}', {'text': 'уточнение'})
+        self.assertEqual(root.replies.count(), 2)
+        response = client.get(reverse('post_view',
+                                      args=[self.user, self.post.pk]))
+        [shown] = response.context['comments']
+        self.assertEqual([c.text for c in shown.thread],
+                         ['ответ', 'уточнение'])
+
+    def test_transfer_keeps_threads(self):
+        root = self.reply(text='корень')
+        self.reply(self.reply(root, 'ответ'), 'ответ на ответ')
+        records = [json.loads(json.dumps(record))
+                   for record in export_records()]
+        import_records(records)
+        copy = Comment.objects.filter(text='корень').exclude(pk=root.pk).get()
+        self.assertEqual([c.text for c in Comment.objects.subtree(copy.path)],
+                         ['корень', 'ответ', 'ответ на ответ'])
+
+    def test_bench_threads(self):
+        out = io.StringIO()
+        call_command('bench_threads', comments=30, roots=5, repeat=1,
+                     stdout=out)
+        recursive, path = json.loads(out.getvalue())
+        self.assertEqual(recursive['comments'], path['comments'])
+        self.assertEqual(path['queries'], 1)
+        self.assertFalse(User.objects.filter(
+            username='bench_threads').exists())
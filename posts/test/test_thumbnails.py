@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b')
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Фото', author=self.user,
+            image=SimpleUploadedFile('photo.gif', SMALL_GIF,
+                                     content_type='image/gif'))
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        response = self.client.get(reverse('profile', args=[self.user]))
+        self.assertContains(response, 'data:image/svg+xml')
+
+    def test_generate_stores_thumbnail_and_bumps_version(self):
+        version = self.post.version
+        name = thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail, name)
+        self.assertEqual(self.post.version, version + 1)
+        response = self.client.get(reverse('profile', args=[self.user]))
+        self.assertContains(response, self.post.thumbnail_url)
+        self.assertNotContains(response, 'data:image/svg+xml')
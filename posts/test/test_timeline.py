@@ -0,0 +1,75 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+from tasks.queue import run_pending
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_follow_backfills_existing_posts(self):
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    def test_new_post_is_fanned_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        entry = TimelineEntry.objects.get(user=self.reader, post=post)
+        self.assertEqual(entry.pub_date, post.pub_date)
+
+    @override_settings(TIMELINE_USE_QUEUE=True)
+    def test_fan_out_can_run_on_a_worker(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(self.reader.timeline.exists())
+        self.assertEqual(run_pending(), 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    def test_unfollow_prunes_timeline(self):
+        Post.objects.create(text='Пост', author=self.author)
+        self.reader_client.get(reverse('profile_follow', args=[self.author]))
+        self.assertEqual(self.reader.timeline.count(), 1)
+        self.reader_client.get(
+            reverse('profile_unfollow', args=[self.author]))
+        self.assertEqual(self.reader.timeline.count(), 0)
+
+    def test_follow_index_reads_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Пост из ленты', author=self.author)
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertContains(response, 'Пост из ленты')
+
+    @override_settings(TIMELINE_MAX_LENGTH=2, TIMELINE_TRIM_EVERY=1)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=str(i), author=self.author)
+                 for i in range(4)]
+        kept = self.reader.timeline.values_list('post_id', flat=True)
+        self.assertEqual(sorted(kept), [posts[2].pk, posts[3].pk])
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='Пост', author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=io.StringIO())
+        self.assertEqual(self.reader.timeline.count(), 1)
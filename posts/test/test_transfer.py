@@ -0,0 +1,94 @@
+import datetime as dt
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
+from posts.transfer import _insert_raw
+
+User = get_user_model()
+
+
+class ContentTransferTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dump.ndjson.gz')
+        self.author = User.objects.create_user(username='writer')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Книги', slug='books',
+                                          description='О книгах')
+        self.post = Post.objects.create(text='Первый', author=self.author,
+                                        group=self.group)
+        self.old_date = timezone.now() - dt.timedelta(days=30)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.old_date)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Хорошо')
+        Comment.objects.update(created=self.old_date)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def dump_and_wipe(self):
+        call_command('export_content', self.path, stderr=io.StringIO())
+        post_id = self.post.pk
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        return post_id
+
+    def test_round_trip_into_empty_database(self):
+        post_id = self.dump_and_wipe()
+        call_command('import_content', self.path, batch_size=1,
+                     chunk_size=2, stdout=io.StringIO())
+        post = Post.objects.select_related('author__stats', 'group').get()
+        self.assertEqual(post.pk, post_id)
+        self.assertEqual(post.pub_date, self.old_date)
+        self.assertEqual(Comment.objects.get().created, self.old_date)
+        self.assertEqual(post.group.slug, 'books')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.author.stats.followers, 1)
+        reader = User.objects.get(username='reader')
+        self.assertFalse(reader.has_usable_password())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=reader, post=post).exists())
+
+    def test_import_shifts_ids_past_existing_posts(self):
+        self.dump_and_wipe()
+        other = User.objects.create_user(username='other')
+        existing = Post.objects.create(text='Уже есть', author=other)
+        call_command('import_content', self.path,
+                     stdout=io.StringIO())
+        imported = Post.objects.get(text='Первый')
+        self.assertGreater(imported.pk, existing.pk)
+        self.assertEqual(Comment.objects.get().post, imported)
+        # The sequence continues after the imported ids.
+        later = Post.objects.create(text='Новый', author=other)
+        self.assertGreater(later.pk, imported.pk)
+
+    def test_raw_insert_keeps_dates(self):
+        # bulk_create would let auto_now_add replace both dates.
+        _insert_raw(Post, [Post(pk=100, text='Старый', author=self.author,
+                                pub_date=self.old_date)])
+        _insert_raw(Comment, [Comment(post_id=100, author=self.reader,
+                                      text='Давно', created=self.old_date)])
+        self.assertEqual(Post.objects.get(pk=100).pub_date, self.old_date)
+        self.assertEqual(Comment.objects.get(text='Давно').created,
+                         self.old_date)
+
+    def test_import_leaves_unrelated_users_alone(self):
+        self.dump_and_wipe()
+        bystander = User.objects.create_user(username='bystander')
+        AuthorStats.objects.update_or_create(user=bystander,
+                                             defaults={'posts': 7})
+        call_command('import_content', self.path, stdout=io.StringIO())
+        self.assertEqual(AuthorStats.objects.get(user=bystander).posts, 7)
+        self.assertEqual(
+            AuthorStats.objects.get(user__username='writer').posts, 1)
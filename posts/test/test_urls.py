@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client
 from posts.models import Post, Group
-from django.urls import reverse
+from django.urls import reverse, set_script_prefix
+from yatube.reverse import cached_reverse
 
 
 User = get_user_model()
@@ -60,3 +61,24 @@ class StaticURLTests(TestCase):
         response = self.unauthorized_client.get('/wrong_adress/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, "misc/404.html")
+
+
+class CachedReverseTests(TestCase):
+
+    def test_matches_reverse(self):
+        for name, args in (('profile', ['user']),
+                           ('post_view', ['user', 5]),
+                           ('group_posts', ['cats']),
+                           ('index', [])):
+            with self.subTest(name=name):
+                self.assertEqual(cached_reverse(name, *args),
+                                 reverse(name, args=args))
+
+    def test_respects_script_prefix(self):
+        cached_reverse('profile', 'user')
+        set_script_prefix('/blog/')
+        try:
+            self.assertEqual(cached_reverse('profile', 'user'),
+                             '/blog/user/')
+        finally:
+            set_script_prefix('/')
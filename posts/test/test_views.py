@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow
+from posts.views import COMMENTS_PER_PAGE
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
@@ -118,28 +119,24 @@ class StaticURLTests(TestCase):
         self.assertNotContains(response, "test_id")
 
     def test_index_cache(self):
-        get_old_page = self.authorized_client.get(reverse('index'))
-        self.assertContains(get_old_page, self.PRESETS['text'])
         get_old_page_unauth = self.unauthorized_client.get(reverse('index'))
         self.assertContains(get_old_page_unauth, self.PRESETS['text'])
-        response = self.authorized_client.post(
-            reverse(
-                'post_edit', args=[
-                    self.user, self.group.pk]), {
-                'text': self.PRESETS['edited_text']},
+        Post.objects.filter(pk=self.post.pk).update(
+            text=self.PRESETS['edited_text'])
+        get_cached_page_unauth = self.unauthorized_client.get(
+            reverse('index'))
+        self.assertNotContains(
+            get_cached_page_unauth,
+            self.PRESETS['edited_text'])
+        self.authorized_client.post(
+            reverse('post_edit', args=[self.user, self.post.pk]),
+            {'text': self.PRESETS['edited_text']},
             follow=True)
         get_new_page = self.authorized_client.get(reverse('index'))
         get_new_page_unauth = self.unauthorized_client.get(reverse('index'))
-        self.assertNotContains(get_new_page, self.PRESETS['edited_text'])
-        self.assertNotContains(
-            get_new_page_unauth,
-            self.PRESETS['edited_text'])
-        cache.clear()
-        get_newest_page = self.authorized_client.get(reverse('index'))
-        get_newest_page_unauth = self.unauthorized_client.get(reverse('index'))
-        self.assertContains(get_newest_page, self.PRESETS['edited_text'])
+        self.assertContains(get_new_page, self.PRESETS['edited_text'])
         self.assertContains(
-            get_newest_page_unauth,
+            get_new_page_unauth,
             self.PRESETS['edited_text'])
 
     def test_unauth_comment(self):
@@ -220,3 +217,38 @@ class StaticURLTests(TestCase):
         un_follow = self.authorized_client_unfollower.get(
             reverse('follow_index'))
         self.assertNotContains(un_follow, self.PRESETS['text'])
+
+
+class CommentChunkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='talker')
+        cls.post = Post.objects.create(text='Обсуждаемый', author=cls.user)
+        for i in range(COMMENTS_PER_PAGE + 5):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Реплика {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_chunk_is_embedded(self):
+        response = self.client.get(
+            reverse('post_view', args=[self.user, self.post.pk]))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text,
+                         f'Реплика {COMMENTS_PER_PAGE + 4}')
+        self.assertContains(response, 'data-comments-more')
+
+    def test_fragment_continues_after_cursor(self):
+        first = self.client.get(
+            reverse('post_view', args=[self.user, self.post.pk]))
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('post_comments', args=[self.user, self.post.pk]),
+                {'before': first.context['comments_next']})
+        self.assertEqual([c.text for c in response.context['comments']],
+                         [f'Реплика {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(response.context['comments_next'])
+        self.assertNotContains(response, 'data-comments-more')
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from sorl.thumbnail import get_thumbnail
+
+from monitoring.metrics import THUMBNAIL_SECONDS, UPLOAD_BYTES
+from monitoring.timing import measure
+from posts.cache import invalidate, post_tags
+from posts.models import Post
+from tasks.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def schedule(post):
+    """Queue every configured thumbnail of a freshly uploaded image."""
+    if not post.image:
+        return
+    UPLOAD_BYTES.observe(post.image.size)
+    Post.objects.filter(pk=post.pk).update(thumbnail='')
+    transaction.on_commit(lambda: _submit(post.pk))
+
+
+def ensure(post):
+    """Queue thumbnails for a post that reached a page without them."""
+    if post.image and not post.thumbnail:
+        transaction.on_commit(lambda: _submit(post.pk))
+
+
+def _submit(post_id):
+    with _lock:
+        if post_id in _pending:
+            return
+        _pending.add(post_id)
+    if settings.THUMBNAIL_USE_QUEUE:
+        enqueue('posts.tasks.generate_thumbnails', post_id)
+        with _lock:
+            _pending.discard(post_id)
+    elif settings.THUMBNAIL_WORKERS:
+        _pool().submit(_run, post_id)
+    else:
+        _run(post_id)
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Thumbnail generation failed for post %s', post_id)
+    finally:
+        with _lock:
+            _pending.discard(post_id)
+        if settings.THUMBNAIL_WORKERS:
+            close_old_connections()
+
+
+def generate(post_id):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id).first()
+    if post is None or not post.image:
+        return None
+    started = time.perf_counter()
+    with measure('thumbnail'):
+        thumbnails = {
+            name: get_thumbnail(post.image, geometry, **options)
+            for name, (geometry, options)
+            in settings.THUMBNAIL_GEOMETRIES.items()
+        }
+    THUMBNAIL_SECONDS.observe(time.perf_counter() - started)
+    card = thumbnails['card']
+    if not card.exists():
+        return None
+    # Only store the result if the image was not replaced meanwhile.
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=card.name, version=F('version') + 1)
+    invalidate(*post_tags(post))
+    return card.name
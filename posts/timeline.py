@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from posts.models import Follow, Post, TimelineEntry
+from tasks.queue import enqueue
+
+BATCH_SIZE = 500
+
+
+def max_length():
+    return getattr(settings, 'TIMELINE_MAX_LENGTH', 1000)
+
+
+def feed_for(user):
+    # Ordered by timeline columns only, so the (user, date, post) index
+    # returns the rows already sorted.
+    return (Post.objects
+            .filter(timeline_entries__user=user)
+            .annotate(feed_date=F('timeline_entries__pub_date'),
+                      feed_post=F('timeline_entries__post_id'))
+            .select_related('author', 'group')
+            .order_by('-feed_date', '-feed_post'))
+
+
+def trim(user_ids):
+    newest = (TimelineEntry.objects
+              .filter(user_id=OuterRef('user_id'))
+              .order_by('-pub_date', '-post_id')
+              .values('pk')[:max_length()])
+    (TimelineEntry.objects
+     .filter(user_id__in=user_ids)
+     .exclude(pk__in=Subquery(newest))
+     .delete())
+
+
+def schedule_fan_out(post):
+    """Fan a new post out, on a worker when TIMELINE_USE_QUEUE is set.
+
+    Fan-out costs a write per follower, so a popular author's post would
+    otherwise make the request slow.
+    """
+    if getattr(settings, 'TIMELINE_USE_QUEUE', False):
+        enqueue('posts.tasks.fan_out', post.pk)
+    else:
+        fan_out(post)
+
+
+def fan_out(post):
+    trim_every = getattr(settings, 'TIMELINE_TRIM_EVERY', 100)
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .order_by('user_id')
+                 .values_list('user_id', flat=True))
+    batch = []
+    for user_id in followers.iterator(chunk_size=BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == BATCH_SIZE:
+            _write(post, batch, trim_every)
+            batch = []
+    if batch:
+        _write(post, batch, trim_every)
+
+
+def _write(post, user_ids, trim_every):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post.pk,
+                       pub_date=post.pub_date) for user_id in user_ids],
+        ignore_conflicts=True)
+    # Trimming scans every follower's timeline, so it is amortised over
+    # several posts; between trims a timeline can briefly exceed the cap.
+    if post.pk % trim_every == 0:
+        trim(user_ids)
+
+
+def backfill(user_id, author_id):
+    posts = (Post.objects.filter(author_id=author_id)
+             .order_by('-pub_date')
+             .values_list('pk', 'pub_date')[:max_length()])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 post__author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    follows = Follow.objects.order_by('user_id')
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+    rebuilt = 0
+    users = follows.values_list('user_id', flat=True).distinct()
+    for user_id in users.iterator(chunk_size=BATCH_SIZE):
+        posts = (Post.objects.filter(author__following__user_id=user_id)
+                 .order_by('-pub_date')
+                 .values_list('pk', 'pub_date')[:max_length()])
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post_id,
+                           pub_date=pub_date)
+             for post_id, pub_date in posts],
+            batch_size=BATCH_SIZE)
+        rebuilt += 1
+    return rebuilt
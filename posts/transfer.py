@@ -0,0 +1,248 @@
+"""Streaming export and import of posts, comments and follows.
+
+Records are newline-delimited JSON, one object per line with a "model"
+key. Users and groups are referenced by username and slug, so a dump can
+be loaded into a database with different primary keys. Post ids are kept
+and shifted past the posts that already exist, which restores them
+unchanged into an empty database and needs no id map in memory.
+"""
+import contextlib
+import gzip
+import itertools
+import json
+import sys
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import AutoField, Max
+from django.utils.dateparse import parse_datetime
+
+from posts import counters, timeline
+from posts.cache import SITE_TAG, invalidate
+from posts.models import (Comment, Follow, Group, Post, User, path_ids,
+                          path_segment)
+
+ORDER = ('group', 'post', 'comment', 'follow')
+
+
+@contextlib.contextmanager
+def open_dump(path, mode):
+    if path == '-':
+        yield sys.stdout if 'w' in mode else sys.stdin
+        return
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, mode + 't', encoding='utf-8') as handle:
+        yield handle
+
+
+def export_records(chunk_size=2000):
+    groups = Group.objects.order_by('pk').values_list(
+        'slug', 'title', 'description')
+    for slug, title, description in groups.iterator(chunk_size=chunk_size):
+        yield {'model': 'group', 'slug': slug, 'title': title,
+               'description': description}
+
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'group__slug', 'image')
+    for pk, text, pub_date, author, group, image in posts.iterator(
+            chunk_size=chunk_size):
+        yield {'model': 'post', 'id': pk, 'text': text,
+               'pub_date': pub_date.isoformat(), 'author': author,
+               'group': group, 'image': image or ''}
+
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created', 'parent_id',
+        'path')
+    for pk, post_id, author, text, created, parent, path in (
+            comments.iterator(chunk_size=chunk_size)):
+        yield {'model': 'comment', 'id': pk, 'post': post_id,
+               'author': author, 'text': text,
+               'created': created.isoformat(), 'parent': parent,
+               'path': path}
+
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username')
+    for user, author in follows.iterator(chunk_size=chunk_size):
+        yield {'model': 'follow', 'user': user, 'author': author}
+
+
+def _insert_raw(model, rows):
+    # bulk_create runs pre_save, and auto_now_add would replace the dates
+    # that come with the dump by the time of the import. Raw inserts, as
+    # loaddata uses, store the field values as they are.
+    for with_pk in (True, False):
+        objs = [row for row in rows if (row.pk is not None) == with_pk]
+        if not objs:
+            continue
+        fields = [field for field in model._meta.concrete_fields
+                  if with_pk or not isinstance(field, AutoField)]
+        size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+        for start in range(0, len(objs), size):
+            model._base_manager._insert(objs[start:start + size],
+                                        fields=fields, raw=True)
+
+
+def _chunks(ids, size=counters.BATCH_SIZE):
+    # Keeps `__in` lookups under the database's parameter limit.
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class Importer:
+    """Buffer records and write them in batched INSERTs.
+
+    Nothing written here goes through the model signals, so
+    `finish()` recounts the denormalised data at the end: the counters of
+    the imported posts and of the users they touch, and the timelines of
+    the users whose feeds they change.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.buffers = {model: [] for model in ORDER}
+        self.counts = dict.fromkeys(ORDER, 0)
+        self.users = {}
+        self.groups = {}
+        # Users whose counters or timelines the import changes.
+        self.touched = set()
+        self.authors = set()
+        self.followers = set()
+        self.post_offset = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        self.comment_offset = (
+            Comment.objects.aggregate(last=Max('pk'))['last'] or 0)
+
+    def user_id(self, username):
+        self.touched.add(username)
+        if username not in self.users:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User(username=username)
+                user.set_unusable_password()
+                user.save()
+            self.users[username] = user.pk
+        return self.users[username]
+
+    def group_id(self, slug):
+        if slug is None:
+            return None
+        if slug not in self.groups:
+            group = Group.objects.filter(slug=slug).first()
+            self.groups[slug] = group.pk if group else None
+        return self.groups[slug]
+
+    def post_id(self, exported_id):
+        if exported_id is None:
+            return None
+        return exported_id + self.post_offset
+
+    def add(self, record):
+        model = record['model']
+        if model == 'group':
+            group, _ = Group.objects.get_or_create(
+                slug=record['slug'],
+                defaults={'title': record['title'],
+                          'description': record['description']})
+            self.groups[group.slug] = group.pk
+            self.counts['group'] += 1
+            return
+        buffer = self.buffers[model]
+        buffer.append(getattr(self, f'build_{model}')(record))
+        if len(buffer) >= self.batch_size:
+            self.flush(model)
+
+    def build_post(self, record):
+        author_id = self.user_id(record['author'])
+        self.authors.add(author_id)
+        return Post(pk=self.post_id(record['id']), text=record['text'],
+                    pub_date=parse_datetime(record['pub_date']),
+                    author_id=author_id,
+                    group_id=self.group_id(record['group']),
+                    image=record['image'] or None)
+
+    def build_comment(self, record):
+        comment = Comment(post_id=self.post_id(record['post']),
+                          author_id=self.user_id(record['author']),
+                          text=record['text'],
+                          created=parse_datetime(record['created']))
+        # Dumps written before threaded comments have no ids; their
+        # comments get ids on insert and paths in finish().
+        if record.get('id') is not None:
+            offset = self.comment_offset
+            comment.pk = record['id'] + offset
+            if record.get('parent') is not None:
+                comment.parent_id = record['parent'] + offset
+            comment.path = ''.join(path_segment(pk + offset)
+                                   for pk in path_ids(record['path']))
+        return comment
+
+    def build_follow(self, record):
+        user_id = self.user_id(record['user'])
+        self.followers.add(user_id)
+        return Follow(user_id=user_id,
+                      author_id=self.user_id(record['author']))
+
+    def flush(self, upto=ORDER[-1]):
+        # Rows that others point at are written first.
+        models = {'post': Post, 'comment': Comment, 'follow': Follow}
+        for name in ORDER[1:ORDER.index(upto) + 1]:
+            rows = self.buffers[name]
+            if not rows:
+                continue
+            if name == 'follow':
+                Follow.objects.bulk_create(rows, ignore_conflicts=True)
+            else:
+                _insert_raw(models[name], rows)
+            self.counts[name] += len(rows)
+            self.buffers[name] = []
+
+    def finish(self):
+        self.flush()
+        sql = connection.ops.sequence_reset_sql(no_style(), [Post, Comment])
+        if sql:
+            with connection.cursor() as cursor:
+                for statement in sql:
+                    cursor.execute(statement)
+        Comment.objects.fill_paths()
+        # Imported comments only belong to imported posts.
+        counters.recount_comments(pk__gt=self.post_offset)
+        users = sorted(self.users[name] for name in self.touched)
+        readers = set(self.followers)
+        for authors in _chunks(sorted(self.authors)):
+            readers.update(Follow.objects.filter(author_id__in=authors)
+                           .values_list('user_id', flat=True))
+        with transaction.atomic():
+            for user_ids in _chunks(users):
+                counters.recount_author_stats(user_ids)
+            for user_ids in _chunks(sorted(readers)):
+                timeline.rebuild(user_ids)
+        invalidate(SITE_TAG)
+
+
+def import_records(records, batch_size=1000, chunk_size=10000,
+                   progress=None, users=None):
+    """Load records, committing once per `chunk_size` records.
+
+    `users` optionally maps usernames to ids known in advance.
+    """
+    importer = Importer(batch_size)
+    importer.users.update(users or {})
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            break
+        with transaction.atomic():
+            for record in chunk:
+                importer.add(record)
+            importer.flush()
+        if progress is not None:
+            progress(importer.counts)
+    importer.finish()
+    return importer.counts
+
+
+def read_records(handle):
+    for line in handle:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
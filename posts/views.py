@@ -1,31 +1,54 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import require_POST
+from posts import reactions, search as fulltext, thumbnails
+from posts.hits import counts_views
+from posts.cache import cache_page_by_tags, mark_write
 from posts.forms import PostForm, CommentForm
-from posts.models import Post, Group, User, Follow
-from django.views.decorators.cache import cache_page
+from posts.models import Comment, Post, Group, User, Follow
+from posts.pagination import chunk, paginate
+from posts.timeline import feed_for
+from yatube.query_budget import query_budget
+from yatube.replicas import replica_safe
 
+COMMENTS_PER_PAGE = 20
 
-@cache_page(20, key_prefix="index_page")
+
+def comment_chunk(post, token=None):
+    """A chunk of top-level comments, each with its replies attached."""
+    comments, next_cursor = chunk(
+        post.comments.filter(parent=None).select_related('author'),
+        token, field='created', per_page=COMMENTS_PER_PAGE)
+    Comment.objects.attach_threads(post.pk, comments)
+    return {'comments': comments, 'comments_next': next_cursor}
+
+
+@replica_safe
+@query_budget(4)
+@cache_page_by_tags(lambda: ['feed'],
+                    timeout=settings.FEED_PAGE_CACHE_TIMEOUT)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = reactions.with_reactions(
+        Post.objects.select_related('author', 'group'), request.user)
     return render(request, 'main_templates/index.html',
-                  {'page': page, 'paginator': paginator})
+                  paginate(request, post_list))
 
 
+@replica_safe
+@query_budget(4)
+@cache_page_by_tags(lambda slug: [f'group:{slug}'],
+                    timeout=settings.FEED_PAGE_CACHE_TIMEOUT)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = reactions.with_reactions(
+        group.posts.select_related('author'), request.user)
     return render(request, 'main_templates/group.html',
-                  {'group': group, 'page': page, 'paginator': paginator})
+                  {'group': group, **paginate(request, post_list)})
 
 
+@query_budget(8)
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -34,40 +57,67 @@ def new_post(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            thumbnails.schedule(post)
+            mark_write(request)
             return redirect('index')
     return render(request, 'main_templates/new_post.html', {'form': form})
 
 
+@replica_safe
+@query_budget(5)
+@cache_page_by_tags(lambda username: [f'author:{username}'],
+                    timeout=settings.FEED_PAGE_CACHE_TIMEOUT)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.filter(author__username=author)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user.id,
-                                          author=author).exists()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "main_templates/profile.html", {'author': author,
-                  'page': page, 'paginator': paginator}
-                  )
-
-
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    post_list = reactions.with_reactions(
+        author.posts.select_related('group'), request.user)
+    following = (request.user.is_authenticated and
+                 Follow.objects.filter(user=request.user.id,
+                                       author=author).exists())
+    return render(request, "main_templates/profile.html",
+                  {'author': author, 'following': following,
+                   **paginate(request, post_list)})
+
+
+@replica_safe
+@query_budget(6)
+@counts_views
+@cache_page_by_tags(
+    lambda username, post_id: [f'post:{post_id}', f'author:{username}'])
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
+    post = get_object_or_404(
+        reactions.with_reactions(
+            Post.objects.select_related('author__stats', 'group'),
+            request.user),
+        author__username=username, pk=post_id)
     author = post.author
-    comments = post.comments.all()
-
     form = CommentForm()
     return render(request, 'main_templates/post.html',
                   {'post': post,
                    'author': author,
                    'form': form,
-                   'comments': comments})
+                   **comment_chunk(post)})
 
 
+@replica_safe
+@query_budget(6)
+@cache_page_by_tags(
+    lambda username, post_id: [f'post:{post_id}', f'author:{username}'])
+def post_comments(request, username, post_id):
+    """The next chunk of comments, as an HTML fragment for "load more"."""
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             author__username=username, pk=post_id)
+    return render(request, 'includes/comment_list.html',
+                  {'post': post, **comment_chunk(post,
+                                                 request.GET.get('before'))})
+
+
+@query_budget(9)
 @login_required
 def post_edit(request, username, post_id):
-    instance = get_object_or_404(Post, author__username=username, pk=post_id)
+    instance = get_object_or_404(Post.objects.select_related('author'),
+                                 author__username=username, pk=post_id)
     if instance.author != request.user:
         return redirect(
             redirect('post', username=username, post_id=instance.pk))
@@ -77,7 +127,10 @@ def post_edit(request, username, post_id):
 
     if request.method == "POST":
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
+            mark_write(request)
             return redirect("post_view", username=request.user.username,
                             post_id=post_id)
 
@@ -85,6 +138,29 @@ def post_edit(request, username, post_id):
                   {"form": form, "post": instance}, )
 
 
+@replica_safe
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    after = fulltext.decode_cursor(request.GET.get('after'))
+    results = fulltext.search(query, after=after,
+                              limit=fulltext.PER_PAGE + 1)
+    has_next = len(results) > fulltext.PER_PAGE
+    results = results[:fulltext.PER_PAGE]
+    posts = reactions.with_reactions(
+        Post.objects.select_related('author', 'group'),
+        request.user).in_bulk([post_id for post_id, _ in results])
+    page = [posts[post_id] for post_id, _ in results if post_id in posts]
+    next_query = None
+    if has_next:
+        params = request.GET.copy()
+        params['after'] = fulltext.encode_cursor(results[-1][1],
+                                                 results[-1][0])
+        next_query = '?' + params.urlencode()
+    return render(request, 'main_templates/search.html',
+                  {'query': query, 'page': page, 'next_query': next_query})
+
+
 def page_not_found(request, exception):
     return render(request, 'misc/404.html', {'path': request.path}, status=404)
 
@@ -93,18 +169,29 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+@query_budget(13)
 @login_required
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
+    post = get_object_or_404(
+        reactions.with_reactions(
+            Post.objects.select_related('author__stats', 'group'),
+            request.user),
+        author__username=username, pk=post_id)
     author = post.author
-    comments = post.comments.all()
+    reply_to = request.GET.get('reply_to', '')
+    parent = None
+    if reply_to.isdigit():
+        parent = get_object_or_404(Comment.objects.select_related('author'),
+                                   post=post, pk=reply_to)
     form = CommentForm(request.POST or None)
     if request.method == 'POST':
         if form.is_valid():
             new_comment = form.save(commit=False)
             new_comment.author = request.user
             new_comment.post = post
+            new_comment.parent = parent
             new_comment.save()
+            mark_write(request)
             return redirect('post_view', username=username,
                             post_id=post_id)
 
@@ -112,32 +199,50 @@ def add_comment(request, username, post_id):
                   {'post': post,
                    'author': author,
                    'form': form,
-                   'comments': comments})
+                   'reply_to': parent,
+                   **comment_chunk(post)})
 
 
+@replica_safe
+@query_budget(3)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = reactions.with_reactions(feed_for(request.user),
+                                         request.user)
     return render(request, 'main_templates/follow.html',
-                  {'page': page, 'paginator': paginator})
+                  paginate(request, post_list, field='feed_date',
+                           tiebreak='feed_post'))
 
 
+@query_budget(15)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
+        mark_write(request)
 
     return redirect('profile', username=username)
 
 
+@query_budget(12)
 @login_required
 def profile_unfollow(request, username):
-    follow_to_delete = Follow.objects.filter(
-                                            user=request.user,
-                                            author__username__contains=username
-                                             ).delete()
+    Follow.objects.filter(user=request.user,
+                          author__username=username).delete()
+    mark_write(request)
     return redirect('profile', username=username)
+
+
+@query_budget(11)
+@login_required
+@require_POST
+def post_like(request, username, post_id):
+    post = get_object_or_404(Post.objects.select_related('author', 'group'),
+                             author__username=username, pk=post_id)
+    liked = reactions.toggle(request.user, post)
+    mark_write(request)
+    if request.is_ajax():
+        return JsonResponse({'liked': liked,
+                             'likes': reactions.count(post.pk)})
+    return redirect('post_view', username=username, post_id=post_id)
@@ -0,0 +1,25 @@
+import base64
+import pickle
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from tasks.queue import enqueue
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Hand messages to the task queue; QUEUED_EMAIL_BACKEND sends them."""
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        payload = base64.b64encode(pickle.dumps(list(email_messages)))
+        enqueue(send_messages, payload.decode())
+        return len(email_messages)
+
+
+def send_messages(payload):
+    messages = pickle.loads(base64.b64decode(payload))
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    connection.send_messages(messages)
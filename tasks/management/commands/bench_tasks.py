@@ -0,0 +1,42 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task
+from tasks.queue import enqueue
+from tasks.worker import Worker
+
+
+def sleep_task(milliseconds):
+    time.sleep(milliseconds / 1000)
+
+
+class Command(BaseCommand):
+    help = 'Измеряет пропускную способность очереди задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--processes', type=int, nargs='+',
+                            default=[1, 2, 4])
+        parser.add_argument('--task-ms', type=float, default=0,
+                            help='длительность одной задачи, мс')
+
+    def handle(self, *args, **options):
+        report = []
+        for processes in options['processes']:
+            started = time.perf_counter()
+            for _ in range(options['tasks']):
+                enqueue(sleep_task, options['task_ms'])
+            enqueued = time.perf_counter() - started
+            started = time.perf_counter()
+            processed = Worker(processes=processes).run(once=True)
+            elapsed = time.perf_counter() - started
+            Task.objects.filter(name__endswith='.sleep_task').delete()
+            report.append({
+                'processes': processes,
+                'tasks': processed,
+                'enqueue_per_sec': round(options['tasks'] / enqueued),
+                'run_per_sec': round(processed / elapsed),
+            })
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None)
+        parser.add_argument('--batch', type=int, default=None,
+                            help='сколько задач забирать за раз')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--visibility-timeout', type=int, default=None)
+        parser.add_argument('--once', action='store_true',
+                            help='выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        worker = Worker(processes=options['processes'],
+                        batch=options['batch'],
+                        poll_interval=options['poll_interval'],
+                        visibility_timeout=options['visibility_timeout'])
+        worker.install_signal_handlers()
+        processed = worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {processed}'))
@@ -0,0 +1,104 @@
+import datetime as dt
+import json
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from tasks.models import Task
+
+ABANDONED = 'Исполнитель не завершил последнюю попытку'
+
+
+def task_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, delay=0, max_attempts=None, **kwargs):
+    """Store a call of `func(*args, **kwargs)` to be run by a worker.
+
+    `func` is a module level function or its dotted path; arguments must
+    be JSON serialisable. The task is only visible to workers once the
+    surrounding transaction commits.
+    """
+    return Task.objects.create(
+        name=task_name(func),
+        arguments=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_after=timezone.now() + dt.timedelta(seconds=delay),
+    )
+
+
+def claim(limit, visibility_timeout=None):
+    """Lock up to `limit` due tasks for this worker and return them.
+
+    Tasks stay locked for `visibility_timeout` seconds; if the worker dies
+    before finishing them they become due again once the lock expires,
+    unless that was their last attempt.
+    """
+    timeout = visibility_timeout or settings.TASKS_VISIBILITY_TIMEOUT
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    Task.objects.filter(
+        status=Task.RUNNING, locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    ).update(status=Task.FAILED, lock='', locked_until=None,
+             last_error=ABANDONED, finished=now)
+    due = (Task.objects
+           .filter(Q(status=Task.QUEUED, run_after__lte=now) |
+                   Q(status=Task.RUNNING, locked_until__lt=now,
+                     attempts__lt=F('max_attempts')))
+           .order_by('run_after')
+           .values('pk')[:limit])
+    # A single UPDATE, so concurrent workers can never claim the same row.
+    Task.objects.filter(pk__in=Subquery(due)).update(
+        status=Task.RUNNING,
+        lock=token,
+        locked_until=now + dt.timedelta(seconds=timeout),
+        attempts=F('attempts') + 1,
+    )
+    return list(Task.objects.filter(lock=token, status=Task.RUNNING))
+
+
+def execute(name, arguments):
+    func = import_string(name)
+    data = json.loads(arguments)
+    func(*data['args'], **data['kwargs'])
+
+
+def complete(task):
+    Task.objects.filter(pk=task.pk, lock=task.lock).update(
+        status=Task.DONE, lock='', locked_until=None,
+        finished=timezone.now())
+
+
+def fail(task, error):
+    """Schedule a retry with exponential backoff or give up."""
+    now = timezone.now()
+    if task.attempts < task.max_attempts:
+        backoff = settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+        changes = {'status': Task.QUEUED,
+                   'run_after': now + dt.timedelta(seconds=backoff)}
+    else:
+        changes = {'status': Task.FAILED, 'finished': now}
+    Task.objects.filter(pk=task.pk, lock=task.lock).update(
+        lock='', locked_until=None, last_error=error, **changes)
+
+
+def run_pending(limit=100):
+    """Run due tasks in the current process (tests, cron, shell)."""
+    processed = 0
+    for task in claim(limit):
+        try:
+            execute(task.name, task.arguments)
+        except Exception:
+            fail(task, traceback.format_exc())
+        else:
+            complete(task)
+        processed += 1
+    return processed
@@ -0,0 +1,141 @@
+import datetime as dt
+import multiprocessing
+import os
+import signal
+import time
+
+from django.core import mail
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import ABANDONED, claim, enqueue, run_pending
+from tasks.worker import TIMED_OUT, Worker
+
+CALLS = []
+
+
+def remember(value, twice=False):
+    CALLS.append(value * 2 if twice else value)
+
+
+def explode():
+    raise RuntimeError('boom')
+
+
+def nap(seconds):
+    time.sleep(seconds)
+
+
+def run_worker(once=False, **options):
+    worker = Worker(processes=2, poll_interval=0.1, **options)
+    worker.install_signal_handlers()
+    worker.run(once=once)
+
+
+def run_slow_task():
+    # The forked worker has its own copy of the in-memory test database,
+    # so it reports the outcome through its exit code.
+    task = enqueue(nap, 60, max_attempts=1)
+    run_worker(once=True, visibility_timeout=1)
+    task.refresh_from_db()
+    raise SystemExit(0 if task.last_error == TIMED_OUT else 1)
+
+
+class QueueTests(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_run(self):
+        task = enqueue(remember, 21, twice=True)
+        self.assertEqual(task.name, 'tasks.tests.remember')
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, [42])
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.DONE)
+
+    def test_delayed_task_is_not_due(self):
+        enqueue(remember, 1, delay=60)
+        self.assertEqual(run_pending(), 0)
+
+    def test_failures_are_retried_then_given_up(self):
+        task = enqueue(explode, max_attempts=2)
+        run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.QUEUED, 1))
+        self.assertIn('boom', task.last_error)
+        Task.objects.update(run_after=timezone.now())
+        run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_expired_lock_makes_task_visible_again(self):
+        enqueue(remember, 1)
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(claim(10), [])
+        Task.objects.update(
+            locked_until=timezone.now() - dt.timedelta(seconds=1))
+        self.assertEqual(len(claim(10)), 1)
+
+    def test_expired_last_attempt_is_failed_not_claimed(self):
+        task = enqueue(remember, 1, max_attempts=1)
+        self.assertEqual(len(claim(10)), 1)
+        Task.objects.update(
+            locked_until=timezone.now() - dt.timedelta(seconds=1))
+        self.assertEqual(claim(10), [])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 1))
+        self.assertEqual(task.last_error, ABANDONED)
+
+    @override_settings(
+        EMAIL_BACKEND='tasks.mail.QueuedEmailBackend',
+        QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_queued_email_backend(self):
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(Task.objects.count(), 1)
+        run_pending()
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+
+
+class WorkerTests(TransactionTestCase):
+
+    def test_process_pool_runs_all_tasks(self):
+        for value in range(5):
+            enqueue(remember, value)
+        enqueue(explode, max_attempts=1)
+        self.assertEqual(Worker(processes=2).run(once=True), 6)
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 5)
+        self.assertEqual(Task.objects.filter(status=Task.FAILED).count(), 1)
+
+    def test_batch_shares_one_deadline(self):
+        slow = [enqueue(nap, 5, max_attempts=1) for _ in range(2)]
+        fast = enqueue(remember, 1)
+        started = time.monotonic()
+        self.assertEqual(Worker(processes=3, visibility_timeout=1)
+                         .run(once=True), 3)
+        self.assertLess(time.monotonic() - started, 4)
+        for task in slow:
+            task.refresh_from_db()
+            self.assertEqual((task.status, task.last_error),
+                             (Task.FAILED, TIMED_OUT))
+        fast.refresh_from_db()
+        self.assertEqual(fast.status, Task.DONE)
+
+    def start(self, target=run_worker):
+        process = multiprocessing.get_context('fork').Process(target=target)
+        process.start()
+        self.addCleanup(process.kill)
+        return process
+
+    def test_sigterm_stops_the_worker_and_its_pool(self):
+        process = self.start()
+        time.sleep(1)
+        os.kill(process.pid, signal.SIGTERM)
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
+
+    def test_timed_out_batch_restarts_the_pool(self):
+        process = self.start(run_slow_task)
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
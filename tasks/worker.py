@@ -0,0 +1,108 @@
+import multiprocessing
+import signal
+import time
+import traceback
+
+from django import db
+from django.conf import settings
+
+from tasks import queue
+
+TIMED_OUT = 'Превышено время выполнения задачи'
+# Share of the visibility timeout a batch may run before it is stopped.
+TIME_LIMIT_SHARE = 0.8
+
+
+def _default_signals():
+    # Pool children must not inherit the worker's graceful stop handlers:
+    # terminate() stops them with SIGTERM, and Ctrl+C is for the parent.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def run_task(name, arguments):
+    """Pool entry point: return a traceback instead of raising it."""
+    try:
+        queue.execute(name, arguments)
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        db.close_old_connections()
+    return None
+
+
+class Worker:
+    """Claim due tasks and run them on a `multiprocessing` pool."""
+
+    def __init__(self, processes=None, batch=None, poll_interval=1.0,
+                 visibility_timeout=None):
+        self.processes = processes or settings.TASKS_PROCESSES
+        self.batch = batch or self.processes * 2
+        self.poll_interval = poll_interval
+        self.visibility_timeout = (visibility_timeout or
+                                   settings.TASKS_VISIBILITY_TIMEOUT)
+        self.stopping = False
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self, once=False):
+        """Process tasks until stopped; with `once`, until the queue is
+        empty. Returns the number of processed tasks."""
+        self.pool = self.start_pool()
+        processed = 0
+        try:
+            while not self.stopping:
+                tasks = queue.claim(self.batch, self.visibility_timeout)
+                if not tasks:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                processed += self.dispatch(tasks)
+        finally:
+            self.pool.terminate()
+        return processed
+
+    def start_pool(self):
+        # Children must not share the parent's database connection.
+        db.connections.close_all()
+        return multiprocessing.Pool(self.processes,
+                                    initializer=_default_signals)
+
+    def dispatch(self, tasks):
+        """Run a claimed batch, waiting for all of it until one deadline.
+
+        The deadline falls well before the locks taken by `claim()`
+        expire, so no other worker can claim a task that is still
+        running. Tasks still running at the deadline are stopped together
+        with the pool, which cannot cancel single tasks, and failed.
+        """
+        deadline = (time.monotonic()
+                    + self.visibility_timeout * TIME_LIMIT_SHARE)
+        results = [(task, self.pool.apply_async(run_task,
+                                                (task.name, task.arguments)))
+                   for task in tasks]
+        while results:
+            results[0][1].wait(max(deadline - time.monotonic(), 0))
+            running = []
+            for task, result in results:
+                if not result.ready():
+                    running.append((task, result))
+                elif result.get():
+                    queue.fail(task, result.get())
+                else:
+                    queue.complete(task)
+            results = running
+            if time.monotonic() >= deadline:
+                break
+        if results:
+            self.pool.terminate()
+            self.pool = self.start_pool()
+            for task, _ in results:
+                queue.fail(task, TIMED_OUT)
+        return len(tasks)
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
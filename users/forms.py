@@ -1,10 +1,20 @@
+from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# First URL segments that are not profiles (see posts/urls.py).
+RESERVED_USERNAMES = {'-'}
+
 
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if username in RESERVED_USERNAMES:
+            raise forms.ValidationError('Это имя пользователя занято.')
+        return username
@@ -1,8 +1,10 @@
 from django.views.generic import CreateView
 from .forms import CreationForm
 from django.urls import reverse_lazy
+from yatube.query_budget import query_budget
 
 
+@query_budget(6)
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy("login")
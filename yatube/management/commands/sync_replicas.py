@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from yatube.models import Heartbeat
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик '
+            '(для проверки чтения с реплик на одной машине)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Реплики-копии бывают только у SQLite')
+        aliases = [alias for alias in settings.DATABASES
+                   if alias != DEFAULT_DB_ALIAS]
+        while True:
+            self.sync(primary['NAME'], aliases)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, source_path, aliases):
+        # Stamped before the copy, so a replica's heartbeat is never
+        # newer than its data.
+        Heartbeat.objects.update_or_create(
+            pk=1, defaults={'beat': timezone.now()})
+        source = sqlite3.connect(source_path)
+        try:
+            for alias in aliases:
+                path = settings.DATABASES[alias]['NAME']
+                temporary = f'{path}.tmp'
+                target = sqlite3.connect(temporary)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                # New connections see the whole new copy or the old one.
+                os.replace(temporary, path)
+                self.stdout.write(f'{alias}: {path}')
+        finally:
+            source.close()
@@ -0,0 +1,9 @@
+from django.db import models
+
+
+class Heartbeat(models.Model):
+    """A single row the replica sync stamps on the primary before copying.
+
+    Reading it back from a replica tells how far behind that replica is.
+    """
+    beat = models.DateTimeField()
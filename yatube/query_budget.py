@@ -0,0 +1,35 @@
+"""Per-view limits on the number of SQL queries.
+
+Views declare their budget with `@query_budget(n)`; the declaration costs
+nothing at runtime and is checked in the tests by
+`posts.test.budget.QueryBudgetMixin`, so a template that starts loading a
+relation per row fails the suite instead of slowing down production.
+`QueryCounter` counts queries the same way in benchmarks and tests.
+"""
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may run for one request."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def budget_of(view):
+    view = getattr(view, 'view_class', view)
+    return getattr(view, 'query_budget', None)
+
+
+class QueryCounter:
+    """`execute_wrapper` that counts queries, except those on `skip` tables.
+    """
+
+    def __init__(self, skip=()):
+        self.count = 0
+        self.skip = tuple(skip)
+
+    def __call__(self, execute, sql, params, many, context):
+        if not any(table in sql for table in self.skip):
+            self.count += 1
+        return execute(sql, params, many, context)
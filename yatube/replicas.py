@@ -0,0 +1,98 @@
+"""Send read-only page views to replica databases.
+
+`ReplicaMiddleware` picks a replica for GET/HEAD requests to views marked
+with `@replica_safe`; `ReplicaRouter` then routes the reads of that
+request there and everything else to the primary. Once a request writes,
+its remaining reads and the session's reads for REPLICA_STICKY_SECONDS go
+to the primary, so users see their own changes. A replica whose
+heartbeat is older than REPLICATION_MAX_LAG is not used.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+
+STICKY_SESSION_KEY = 'db_primary_until'
+
+_state = threading.local()
+_lags = {}
+
+
+def replica_safe(view):
+    """Allow GET/HEAD requests to `view` to read from a replica."""
+    view.replica_safe = True
+    return view
+
+
+def lag(alias):
+    """Seconds the replica is behind, checked every REPLICA_CHECK_INTERVAL."""
+    checked, value = _lags.get(alias, (0, None))
+    if time.monotonic() - checked < settings.REPLICA_CHECK_INTERVAL:
+        return value
+    from yatube.models import Heartbeat
+    try:
+        beat = (Heartbeat.objects.using(alias)
+                .values_list('beat', flat=True).first())
+    except DatabaseError:
+        beat = None
+    value = (float('inf') if beat is None
+             else (timezone.now() - beat).total_seconds())
+    _lags[alias] = (time.monotonic(), value)
+    return value
+
+
+def healthy_replica():
+    replicas = [alias for alias in settings.REPLICA_DATABASES
+                if lag(alias) <= settings.REPLICATION_MAX_LAG]
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'wrote', False):
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'alias', None)
+
+    def db_for_write(self, model, **hints):
+        # Only a request remembers its writes: management commands and
+        # workers would otherwise stay pinned to the primary for good.
+        if getattr(_state, 'in_request', False):
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema together with the data from sync_replicas.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.alias, _state.wrote, _state.in_request = None, False, True
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                request.session[STICKY_SESSION_KEY] = (
+                    time.time() + settings.REPLICA_STICKY_SECONDS)
+        finally:
+            _state.alias, _state.wrote, _state.in_request = None, False, False
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and getattr(view_func, 'replica_safe', False)
+                and request.session.get(STICKY_SESSION_KEY, 0) < time.time()):
+            _state.alias = request.db_replica = healthy_replica()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +28,9 @@ SITE_ID = 1
 INSTALLED_APPS = [
     'users',
     'posts',
+    'tasks',
+    'monitoring',
+    'yatube',
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -39,11 +43,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.ServerTimingMiddleware',
+    'monitoring.middleware.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yatube.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -52,7 +59,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'monitoring.templates.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -66,6 +74,16 @@ TEMPLATES = [
         },
     },
 ]
+if not DEBUG:
+    # Templates are parsed once per process (wsgi.py loads them all at
+    # startup) instead of on every render.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
@@ -74,6 +92,24 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Read-only copies of the primary, refreshed by `sync_replicas` (or by
+# the real replication when the primary is not SQLite). Only declared when
+# YATUBE_USE_REPLICAS is set.
+if os.environ.get('YATUBE_USE_REPLICAS'):
+    for number in range(1, int(os.environ.get('YATUBE_REPLICAS', 1)) + 1):
+        DATABASES[f'replica{number}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+# Replicas further behind than this many seconds are not read from.
+REPLICATION_MAX_LAG = 5
+REPLICA_CHECK_INTERVAL = 1
+# After a write the session reads from the primary for this long.
+REPLICA_STICKY_SECONDS = 10
+# Pages rendered from a replica may be stale, so they are cached briefly.
+REPLICA_PAGE_CACHE_TIMEOUT = 60
 
 
 
@@ -113,10 +149,109 @@ LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 LOGOUT_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+QUEUED_EMAIL_BACKEND = EMAIL_BACKEND
+if not DEBUG:
+    EMAIL_BACKEND = "tasks.mail.QueuedEmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'monitoring.cache.TimedLocMemCache',
     }
 }
+if not DEBUG:
+    # Shared by every worker process on the host, so page cache entries
+    # and their invalidation are visible to all of them.
+    CACHES['default'] = {
+        'BACKEND': 'monitoring.cache.TimedSQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    }
+
+TIMELINE_MAX_LENGTH = 1000
+TIMELINE_TRIM_EVERY = 100
+# Copy new posts into the followers' timelines on a run_workers worker
+# instead of in the request that created them.
+TIMELINE_USE_QUEUE = not DEBUG
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Like counters are split over this many rows per post.
+REACTION_SHARDS = 8
+
+# Post views are buffered per process and written by a background thread
+# after this many views or seconds, whichever comes first.
+VIEW_BUFFER_ENABLED = True
+VIEW_FLUSH_EVENTS = 100
+VIEW_FLUSH_SECONDS = 10
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+# Likes only invalidate the post's own page, so feeds that show like
+# counts are kept this long at most.
+FEED_PAGE_CACHE_TIMEOUT = 60
+PAGE_CACHE_BYPASS_SECONDS = 10
+
+# Every geometry is generated in the background right after an upload;
+# `card` is the one shown in post cards.
+THUMBNAIL_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_WORKERS = 2
+# Hand thumbnails to the durable task queue (run_workers) instead of the
+# in-process thread pool.
+THUMBNAIL_USE_QUEUE = not DEBUG
+
+TASKS_PROCESSES = 4
+TASKS_MAX_ATTEMPTS = 3
+TASKS_RETRY_DELAY = 30
+TASKS_VISIBILITY_TIMEOUT = 300
+
+# Server-Timing is sent to everybody while debugging and to staff only in
+# production.
+SERVER_TIMING_PUBLIC = DEBUG
+# Share of requests run under the sampling profiler; their collapsed
+# stacks are appended to PROFILE_DIR/<url name>.folded.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Every worker process keeps its metrics in a memory-mapped file here;
+# /metrics adds them up. Must be on a local disk shared by the workers.
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'yatube-metrics'))
+# Scrapers send it as `Authorization: Bearer <token>` (bearer_token in
+# Prometheus); /metrics answers 403 to everybody while it is empty.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Opt-in: group each request's queries by fingerprint, flag the ones
+# repeated QUERY_LOG_REPEAT_THRESHOLD times (N+1) and keep totals for the
+# admin. Costs a stack walk per query and a few writes per request.
+QUERY_LOG_ENABLED = False
+QUERY_LOG_REPEAT_THRESHOLD = 5
+QUERY_LOG_FILE = os.path.join(BASE_DIR, 'logs', 'queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'query_log': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'monitoring.queries': {
+            'handlers': ['query_log'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,27 @@
+"""Settings for test runs: `manage.py test` and pytest load these."""
+import atexit
+import shutil
+import tempfile
+
+from yatube.settings import *  # noqa: F401,F403
+
+# Threads can share the in-memory test database only through table
+# locks, and a thumbnail still being made in the pool then breaks the
+# teardown of transactional tests, so tests make thumbnails inline.
+THUMBNAIL_WORKERS = 0
+
+# Not the directory a locally running server exports.
+METRICS_DIR = tempfile.mkdtemp(prefix='yatube-metrics-')
+atexit.register(shutil.rmtree, METRICS_DIR, ignore_errors=True)
+
+# Views counted by a test would otherwise stay buffered past its database.
+VIEW_BUFFER_ENABLED = False
+
+# The routing tests read through a replica alias that mirrors the primary;
+# only they turn it on.
+DATABASES['replica1'] = {  # noqa: F405
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': 'replica1',
+    'TEST': {'MIRROR': 'default'},
+}
+REPLICA_DATABASES = []
@@ -0,0 +1,195 @@
+"""Cache backend shared by all worker processes on one host.
+
+Entries live in a SQLite database in WAL mode, so readers never block the
+writer and every gunicorn worker sees the same entries and the same page
+cache generations. Eviction is approximately LRU and bounded both by
+MAX_ENTRIES and by OPTIONS['MAX_SIZE'] in bytes.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+"""
+
+# Reads only refresh the LRU timestamp when it is older than this, so a
+# hot key does not turn every cache hit into a write.
+ACCESS_GRANULARITY = 1.0
+CULL_CHECK_EVERY = 64
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=30,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _write(self, conn, key, value, timeout, mode='REPLACE'):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        cursor = conn.execute(
+            f'INSERT OR {mode} INTO cache_entry '
+            '(key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+            (key, blob, self._expires(timeout), time.time(), len(blob)))
+        return cursor.rowcount
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % CULL_CHECK_EVERY == 0:
+            self.cull()
+
+    def cull(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entry WHERE expires < ?',
+                     (time.time(),))
+        count, size = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry'
+        ).fetchone()
+        if count <= self._max_entries and size <= self._max_size:
+            return
+        excess = max(count // self._cull_frequency,
+                     count - self._max_entries, 1)
+        if size > self._max_size and count:
+            excess = max(excess,
+                         int(count * (size - self._max_size) / size) + 1)
+        conn.execute(
+            'DELETE FROM cache_entry WHERE key IN ('
+            'SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+            (excess,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entry WHERE key = ? '
+                         'AND expires < ?', (key, time.time()))
+            added = self._write(conn, key, value, timeout, mode='IGNORE')
+        self._maybe_cull()
+        return bool(added)
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        if not mapping:
+            return {}
+        now = time.time()
+        conn = self._connection()
+        placeholders = ','.join('?' * len(mapping))
+        rows = conn.execute(
+            'SELECT key, value, expires, accessed FROM cache_entry '
+            f'WHERE key IN ({placeholders})', list(mapping)).fetchall()
+        found, stale, expired = {}, [], []
+        for key, blob, expires, accessed in rows:
+            if expires is not None and expires < now:
+                expired.append(key)
+                continue
+            found[mapping[key]] = pickle.loads(blob)
+            if now - accessed > ACCESS_GRANULARITY:
+                stale.append(key)
+        if expired:
+            conn.executemany(
+                'DELETE FROM cache_entry WHERE key = ? AND expires < ?',
+                [(key, now) for key in expired])
+        if stale:
+            conn.executemany(
+                'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                [(now, key) for key in stale])
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write(self._connection(), key, value, timeout)
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for key, value in data.items():
+                self._write(conn, self._key(key, version), value, timeout)
+        self._maybe_cull()
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entry SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires >= ?)',
+            (self._expires(timeout), time.time(), key, time.time()))
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT value, expires FROM cache_entry WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            conn.execute(
+                'UPDATE cache_entry SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (blob, len(blob), time.time(), key))
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        self._connection().executemany(
+            'DELETE FROM cache_entry WHERE key = ?',
+            [(self._key(key, version),) for key in keys])
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ? '
+            'AND (expires IS NULL OR expires >= ?)',
+            (key, time.time())).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entry')
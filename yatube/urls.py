@@ -4,6 +4,7 @@ from django.contrib.flatpages import views
 from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
+from monitoring.views import metrics_view
 
 handler404 = "posts.views.page_not_found" # noqa
 handler500 = "posts.views.server_error" # noqa
@@ -16,6 +17,8 @@ urlpatterns = [
      path('about-spec/', views.flatpage, {'url': '/about-spec/'},
           name='about-spec'),
      path("admin/", admin.site.urls),
+     path("metrics", metrics_view, name="metrics"),
+     path("api/v1/", include("posts.api_urls")),
      path('about/', include('django.contrib.flatpages.urls')),
      path("auth/", include("users.urls")),
      path("auth/", include("django.contrib.auth.urls")),
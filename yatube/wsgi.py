@@ -1,7 +1,17 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from django.template import engines
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Imported once the app registry is ready.
+from posts import hits  # noqa: E402
+
+hits.start_flusher()
+
+if not settings.DEBUG:
+    engines['django'].precompile()